@@ -0,0 +1,8 @@
+-- Migration: Store RLS filter values as JSONB
+-- Description: filter_value was TEXT holding JSON written by the API; store it natively so the
+-- driver returns decoded values and the column can be indexed/queried directly
+
+ALTER TABLE user_rls_filters
+    ALTER COLUMN filter_value TYPE JSONB USING filter_value::jsonb;
+
+COMMENT ON COLUMN user_rls_filters.filter_value IS 'Filter value (string, number, or array) as JSONB';
@@ -4,6 +4,13 @@ API module.
 FastAPI-based REST API for natural language analytics.
 """
 
-from src.api.app import create_app, get_app
-
 __all__ = ["create_app", "get_app"]
+
+
+def __getattr__(name):
+    # Imported lazily: app.py loads config from the database and pulls in every
+    # router, which importing a submodule such as src.api.auth must not trigger
+    if name in __all__:
+        from src.api import app
+        return getattr(app, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -21,7 +21,7 @@ initialize_config()
 from src.api.routes import router
 from src.api.vector_routes import router as vector_router
 from src.api.setup import router as setup_router, is_setup_complete
-from src.user.rls_config_api import router as rls_router
+from src.user.rls_config_api import router as rls_router, get_audit_writer
 from src.api.rls_query_example import router as rls_query_router
 from src.config.settings import get_settings
 
@@ -36,9 +36,11 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     # Startup
     logger.info("Starting DataTruth API...")
+    get_audit_writer().start()
     yield
     # Shutdown
     logger.info("Shutting down DataTruth API...")
+    await get_audit_writer().stop()
 
 
 def create_app() -> FastAPI:
@@ -10,7 +10,6 @@ from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api.auth import get_current_user
-from src.api.models import User
 from src.database.connection import get_db
 from src.user.rls_loader import load_user_context_for_api, get_rls_summary
 from src.integration.orchestrator_v2 import QueryOrchestrator, QueryRequest
@@ -32,7 +31,7 @@ class NaturalLanguageQueryWithRLS(BaseModel):
 async def query_with_rls(
     request: NaturalLanguageQueryWithRLS,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user)
 ):
     """
     Execute a natural language query with RLS enabled.
@@ -60,7 +59,7 @@ async def query_with_rls(
         # Load user RLS context from database
         user_context = await load_user_context_for_api(
             db=db,
-            user_id=current_user.id,
+            user_id=int(current_user['user_id']),
             connection_id=request.connection_id,
             enable_rls=request.enable_rls
         )
@@ -68,9 +67,9 @@ async def query_with_rls(
         # Log RLS configuration being used
         if user_context:
             rls_summary = get_rls_summary(user_context)
-            logger.info(f"Query with RLS for user {current_user.username}: {rls_summary}")
+            logger.info(f"Query with RLS for user {current_user['username']}: {rls_summary}")
         else:
-            logger.info(f"Query without RLS for user {current_user.username} (admin mode)")
+            logger.info(f"Query without RLS for user {current_user['username']} (admin mode)")
         
         # Create query orchestrator
         orchestrator = QueryOrchestrator(connection_id=request.connection_id)
@@ -100,7 +99,7 @@ async def query_with_rls(
         
     except PermissionError as e:
         # User doesn't have permission to access the data
-        logger.warning(f"Permission denied for user {current_user.username}: {e}")
+        logger.warning(f"Permission denied for user {current_user['username']}: {e}")
         raise HTTPException(status_code=403, detail=str(e))
     except Exception as e:
         logger.error(f"Error executing query with RLS: {e}", exc_info=True)
@@ -111,7 +110,7 @@ async def query_with_rls(
 async def get_rls_status(
     connection_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user)
 ):
     """
     Get RLS configuration status for the current user and connection.
@@ -129,7 +128,7 @@ async def get_rls_status(
         # Load user context
         user_context = await load_user_context_for_api(
             db=db,
-            user_id=current_user.id,
+            user_id=int(current_user['user_id']),
             connection_id=connection_id,
             enable_rls=True
         )
@@ -145,8 +144,8 @@ async def get_rls_status(
         
         return {
             'rls_enabled': True,
-            'user_id': current_user.id,
-            'username': current_user.username,
+            'user_id': current_user['user_id'],
+            'username': current_user['username'],
             'connection_id': connection_id,
             'rls_summary': summary,
             'message': f'RLS active with {summary["rls_filters_count"]} filters'
@@ -170,7 +169,7 @@ To integrate RLS into your existing query endpoint:
 3. Load user context before executing query:
    user_context = await load_user_context_for_api(
        db=db,
-       user_id=current_user.id,
+       user_id=int(current_user['user_id']),
        connection_id=connection_id,
        enable_rls=True  # Set to False for admin bypass
    )
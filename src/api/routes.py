@@ -170,6 +170,21 @@ async def get_metrics():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/debug/pool", response_model=dict, tags=["Monitoring"])
+async def get_pool_status():
+    """
+    Get async database pool statistics for live diagnosis.
+    Only available when app_debug is enabled.
+    """
+    from src.config.settings import get_settings
+    from src.database.connection import get_async_pool_status
+    
+    if not get_settings().app_debug:
+        raise HTTPException(status_code=404, detail="Not found")
+    
+    return get_async_pool_status()
+
+
 # Helper Functions
 
 
@@ -558,33 +573,36 @@ def _build_semantic_layer_from_schema(schema_data, mapper, connection_id, skip_v
     # Store all metrics and dimensions to vector DB (only during discovery, not on every query)
     if vector_store and not skip_vector_upsert:
         try:
-            fields_added = 0
-            for metric_name, metric in metrics.items():
-                vector_store.add_field(
-                    connection_id=connection_id,
-                    table_name=metric.base_table,
-                    column_name=metric.formula.split('.')[-1] if '.' in metric.formula else metric.formula,
-                    display_name=metric.display_name,
-                    description=metric.description,
-                    is_measure=True,
-                    synonyms=metric.synonyms,
-                    data_type=metric.data_type.value
-                )
-                fields_added += 1
-            
-            for dim_name, dimension in dimensions.items():
-                vector_store.add_field(
-                    connection_id=connection_id,
-                    table_name=dimension.table,
-                    column_name=dimension.field,
-                    display_name=dimension.display_name,
-                    description=dimension.description,
-                    is_measure=False,
-                    synonyms=dimension.synonyms,
-                    data_type="string"  # Dimensions are typically strings
-                )
-                fields_added += 1
+            fields = [
+                {
+                    "connection_id": connection_id,
+                    "table_name": metric.base_table,
+                    "column_name": metric.formula.split('.')[-1] if '.' in metric.formula else metric.formula,
+                    "display_name": metric.display_name,
+                    "description": metric.description,
+                    "is_measure": True,
+                    "synonyms": metric.synonyms,
+                    "data_type": metric.data_type.value
+                }
+                for metric in metrics.values()
+            ]
+            fields.extend(
+                {
+                    "connection_id": connection_id,
+                    "table_name": dimension.table,
+                    "column_name": dimension.field,
+                    "display_name": dimension.display_name,
+                    "description": dimension.description,
+                    "is_measure": False,
+                    "synonyms": dimension.synonyms,
+                    "data_type": "string"  # Dimensions are typically strings
+                }
+                for dimension in dimensions.values()
+            )
+            vector_store.add_fields_bulk(fields)
+            fields_added = len(fields)
             
+            vector_store.flush()
             logger.info(f"Added {fields_added} fields to vector store for connection {connection_id}")
         except Exception as e:
             logger.error(f"Failed to add fields to vector store: {e}")
@@ -3101,6 +3119,7 @@ async def save_field_mapping(
                 data_type=data_type,
                 default_aggregation=default_aggregation
             )
+            vector_store.flush()
             logger.info(f"Added field embedding to vector store: {connection_id}:{table_name}.{field_name}")
         except Exception as e:
             logger.warning(f"Failed to add field to vector store: {e}")
@@ -50,6 +50,14 @@ class Settings(BaseSettings):
     postgres_admin_user: str = "postgres"
     postgres_admin_password: str = "postgres"
 
+    # Async Engine Pool (API routes)
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: int = 30
+    db_pool_recycle_seconds: int = 1800
+    db_statement_cache_size: int = 2048  # asyncpg cache (raw fetch)
+    db_prepared_statement_cache_size: int = 2048  # SQLAlchemy asyncpg adapter cache (text())
+
     # OpenAI Configuration - Optional until setup wizard completes
     openai_api_key: str = ""  # Will be set by setup wizard
     openai_model: str = "gpt-4o-mini"  # Changed from gpt-4 to support JSON mode
@@ -4,13 +4,15 @@ Database execution module.
 Handles PostgreSQL connections, query execution, and result formatting.
 """
 
-from src.database.connection import ConnectionPool, get_connection_pool
+from src.database.connection import ConnectionPool, get_async_engine, get_connection_pool, get_db
 from src.database.executor import QueryExecutor, QueryExecutionError, QueryResult, execute_query
 from src.database.cache import QueryCache, get_query_cache
 
 __all__ = [
     "ConnectionPool",
     "get_connection_pool",
+    "get_async_engine",
+    "get_db",
     "QueryExecutor",
     "QueryExecutionError",
     "QueryResult",
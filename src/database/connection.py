@@ -7,12 +7,20 @@ Manages database connections with pooling for performance and reliability.
 import logging
 from contextlib import contextmanager
 from functools import lru_cache
-from typing import Generator, Optional
+from typing import AsyncGenerator, Generator, Optional
 from urllib.parse import quote_plus
 
+import orjson
 import psycopg2
 from psycopg2 import pool
 from psycopg2.extensions import connection as Connection
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
 from src.config.settings import get_settings
 
@@ -165,3 +173,111 @@ def get_connection_pool() -> ConnectionPool:
         _connection_pool.initialize()
 
     return _connection_pool
+
+
+# Async engine (asyncpg) used by the FastAPI routes
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def _build_async_connection_string() -> str:
+    """Build asyncpg connection string from settings with URL-encoded password."""
+    settings = get_settings()
+    encoded_password = quote_plus(settings.postgres_password)
+    return (
+        f"postgresql+asyncpg://{settings.postgres_user}:{encoded_password}"
+        f"@{settings.postgres_host}:{settings.postgres_port}/{settings.postgres_db}"
+    )
+
+
+def _encode_json(value) -> str:
+    """Encode a Python value for a json/jsonb parameter."""
+    return orjson.dumps(value).decode()
+
+
+async def _set_json_codecs(conn) -> None:
+    """Register orjson codecs so json/jsonb columns round-trip as Python objects."""
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name,
+            encoder=_encode_json,
+            decoder=orjson.loads,
+            schema="pg_catalog",
+            format="text",
+        )
+
+
+def _on_connect(dbapi_connection, connection_record) -> None:
+    """Configure each new asyncpg connection as the pool opens it."""
+    dbapi_connection.run_async(_set_json_codecs)
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Get or create the global async engine.
+
+    Returns:
+        AsyncEngine backed by asyncpg
+    """
+    global _async_engine, _async_session_factory
+
+    if _async_engine is None:
+        settings = get_settings()
+        _async_engine = create_async_engine(
+            _build_async_connection_string(),
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_seconds,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            pool_pre_ping=True,
+            connect_args={
+                # Short OLTP queries never benefit from JIT compilation
+                "server_settings": {"jit": "off"},
+                # Statements run through the session are prepared by SQLAlchemy's
+                # adapter; raw asyncpg fetches use asyncpg's own cache
+                "prepared_statement_cache_size": settings.db_prepared_statement_cache_size,
+                "statement_cache_size": settings.db_statement_cache_size,
+            },
+        )
+        # Runs after the dialect's own setup, so these codecs take precedence
+        event.listen(_async_engine.sync_engine, "connect", _on_connect)
+        _async_session_factory = async_sessionmaker(_async_engine, expire_on_commit=False)
+        logger.info(
+            f"Async database engine created (pool_size={settings.db_pool_size}, "
+            f"max_overflow={settings.db_max_overflow})"
+        )
+
+    return _async_engine
+
+
+def get_async_pool_status() -> dict:
+    """
+    Get async engine pool statistics.
+
+    Returns:
+        Pool size, checked-in/out and overflow counts, or an empty dict
+        if the engine has not been created yet
+    """
+    if _async_engine is None:
+        return {}
+
+    pool_ = _async_engine.pool
+    return {
+        "status": pool_.status(),
+        "size": pool_.size(),
+        "checked_in": pool_.checkedin(),
+        "checked_out": pool_.checkedout(),
+        "overflow": pool_.overflow(),
+    }
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI dependency yielding an async database session.
+
+    Yields:
+        AsyncSession bound to the global async engine
+    """
+    get_async_engine()
+    async with _async_session_factory() as session:
+        yield session
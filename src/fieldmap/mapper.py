@@ -204,12 +204,13 @@ class FieldMapper:
     def _load_from_vector_db(self):
         """Load all field mappings from vector DB on startup."""
         try:
-            from src.vector import get_vector_store
+            from src.vector import decode_field_metadata, get_vector_store
             vector_store = get_vector_store()
             
             print(f"[FieldMapper] Loading field mappings from vector DB...")
             
             # Get all fields from semantic_fields collection
+            vector_store.flush()
             all_fields = vector_store.fields_collection.get()
             
             print(f"[FieldMapper] Vector DB returned: {len(all_fields.get('metadatas', [])) if all_fields else 0} fields")
@@ -222,12 +223,10 @@ class FieldMapper:
             # Convert vector DB entries to FieldMapping objects
             for i, metadata in enumerate(all_fields['metadatas']):
                 try:
-                    # Parse synonyms from comma-separated string
-                    synonyms_str = metadata.get('synonyms', '')
-                    synonyms = [s.strip() for s in synonyms_str.split(',') if s.strip()] if synonyms_str else []
-                    
-                    # Parse boolean
-                    is_measure = metadata.get('is_measure', 'False') == 'True'
+                    # Synonyms list and is_measure bool (handles the legacy string forms)
+                    decoded = decode_field_metadata(metadata)
+                    synonyms = decoded['synonyms']
+                    is_measure = decoded['is_measure']
                     
                     mapping = FieldMapping(
                         connection_id=metadata.get('connection_id'),
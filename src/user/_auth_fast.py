@@ -0,0 +1,208 @@
+"""
+Authorization Fast Path
+
+Pre-indexed per-user permission checks used on every query authorization.
+
+The module is plain, strictly typed Python with no project imports so it can
+be compiled with mypyc (``mypyc src/user/_auth_fast.py``). When a compiled
+extension is present it is imported in place of this file; otherwise the
+interpreted version is used unchanged.
+"""
+
+import re
+import sys
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+try:
+    import ahocorasick  # optional: pyahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+# Up to this many governed tables a str.find loop beats building a matcher
+_MATCHER_MIN_TABLES = 8
+
+
+def _build_table_matcher(tables: Tuple[str, ...]) -> Any:
+    """Build a single-pass matcher for table names: Aho-Corasick, else one regex."""
+    if HAS_AHOCORASICK:
+        automaton = ahocorasick.Automaton()
+        for table in tables:
+            automaton.add_word(table, table)
+        automaton.make_automaton()
+        return automaton
+    return re.compile("|".join(re.escape(t) for t in sorted(tables, key=len, reverse=True)))
+
+
+class UserContextFast:
+    """
+    Immutable, pre-indexed view of a UserContext.
+
+    Every check is a flag read, a bitwise AND, or a set/dict lookup.
+    Instances are built by ``authorization.UserContext`` and never mutated.
+    """
+
+    __slots__ = (
+        "user_id",
+        "username",
+        "roles",
+        "effective_mask",
+        "table_access",
+        "allowed_columns",
+        "denied_columns",
+        "rls_by_table",
+        "metric_access",
+        "_is_admin",
+        "_has_query_data",
+        "_can_access_tables",
+        "_can_view_metrics",
+        "_has_metric_perms",
+        "_rls_sql_by_table",
+        "_rls_fragments",
+        "_rls_clauses",
+        "_rls_governed",
+        "_rls_matcher",
+    )
+
+    def __init__(
+        self,
+        user_id: str,
+        username: str,
+        roles: Tuple[object, ...],
+        effective_mask: int,
+        is_admin: bool,
+        has_query_data: bool,
+        can_access_tables: bool,
+        can_view_metrics: bool,
+        table_access: Dict[str, bool],
+        allowed_columns: Dict[str, Optional[FrozenSet[str]]],
+        denied_columns: Dict[str, FrozenSet[str]],
+        rls_by_table: Dict[str, Tuple[str, ...]],
+        metric_access: Dict[str, bool],
+    ) -> None:
+        """
+        Store indexed permissions and derive flags.
+
+        Args:
+            user_id: Unique user identifier
+            username: Username
+            roles: User roles
+            effective_mask: OR of role and custom permission bits
+            is_admin: Whether the user has the admin role
+            has_query_data: Whether QUERY_DATA is in the mask
+            can_access_tables: ACCESS_TABLE granted and table rules present
+            can_view_metrics: Whether VIEW_METRICS is in the mask
+            table_access: Table name -> can query or view
+            allowed_columns: Table name -> allowed columns (None = all)
+            denied_columns: Table name -> denied columns
+            rls_by_table: Table name -> RLS filter conditions
+            metric_access: Metric name -> can query
+        """
+        self.user_id = user_id
+        self.username = username
+        self.roles = roles
+        self.effective_mask = effective_mask
+        self.table_access = table_access
+        self.allowed_columns = allowed_columns
+        self.denied_columns = denied_columns
+        self.rls_by_table = rls_by_table
+        self.metric_access = metric_access
+        self._is_admin = is_admin
+        self._has_query_data = has_query_data
+        self._can_access_tables = can_access_tables
+        self._can_view_metrics = can_view_metrics
+        self._has_metric_perms = bool(metric_access)
+        # "(cond1) AND (cond2)" per table, ready to splice into a WHERE clause
+        self._rls_sql_by_table: Dict[str, str] = {
+            table: " AND ".join(["(" + cond + ")" for cond in conds])
+            for table, conds in rls_by_table.items()
+        }
+        self._rls_fragments: Dict[Tuple[str, ...], str] = {}
+        self._rls_clauses: Dict[Tuple[str, ...], str] = {}
+        # Lower-cased names of tables with RLS filters, for substring pre-checks
+        self._rls_governed: Tuple[str, ...] = tuple(
+            dict.fromkeys(sys.intern(table.lower()) for table in rls_by_table)
+        )
+        # Built on first use, and only for tenants with many governed tables
+        self._rls_matcher: Any = None
+
+    def has_permission(self, permission: int) -> bool:
+        """Check if user has a specific permission bit."""
+        return (self.effective_mask & permission) != 0
+
+    def can_access_table(self, table_name: str) -> bool:
+        """Check if user can access a table (deny by default)."""
+        if not self._can_access_tables:
+            return False
+        return self.table_access.get(table_name, False)
+
+    def can_access_column(self, table_name: str, column_name: str) -> bool:
+        """Check if user can access a specific column."""
+        if not self.can_access_table(table_name):
+            return False
+
+        if column_name in self.denied_columns[table_name]:
+            return False
+
+        allowed = self.allowed_columns[table_name]
+        if allowed is not None:
+            return column_name in allowed
+
+        return True
+
+    def can_access_metric(self, metric_name: str) -> bool:
+        """Check if user can access a metric (allow by default)."""
+        if not self._can_view_metrics:
+            return False
+        if not self._has_metric_perms:
+            return True
+        return self.metric_access.get(metric_name, True)
+
+    def get_rls_filters_for_table(self, table_name: str) -> List[str]:
+        """Get all RLS filter conditions for a table."""
+        return list(self.rls_by_table.get(table_name, ()))
+
+    def rls_where_for(self, table_name: str) -> Optional[str]:
+        """Get the pre-joined RLS condition for a table, or None if unfiltered."""
+        return self._rls_sql_by_table.get(table_name)
+
+    def mentions_rls_table(self, sql_lower: str) -> bool:
+        """Check whether lower-cased SQL text mentions any RLS-governed table."""
+        if len(self._rls_governed) <= _MATCHER_MIN_TABLES:
+            for table in self._rls_governed:
+                if sql_lower.find(table) != -1:
+                    return True
+            return False
+
+        # One pass over the SQL regardless of how many tables are governed
+        matcher = self._rls_matcher
+        if matcher is None:
+            matcher = self._rls_matcher = _build_table_matcher(self._rls_governed)
+        if HAS_AHOCORASICK:
+            return next(matcher.iter(sql_lower), None) is not None
+        return matcher.search(sql_lower) is not None
+
+    def rls_where_fragment(self, table_names: Tuple[str, ...]) -> str:
+        """Get the joined RLS condition for a set of tables, memoized per tuple."""
+        fragment = self._rls_fragments.get(table_names)
+        if fragment is None:
+            parts: List[str] = []
+            for table in table_names:
+                where = self._rls_sql_by_table.get(table)
+                if where is not None:
+                    parts.append(where)
+            fragment = " AND ".join(parts)
+            self._rls_fragments[table_names] = fragment
+        return fragment
+
+    def rls_where_clause(self, table_names: Tuple[str, ...]) -> str:
+        """Get " WHERE <fragment>" for a set of tables, ready to append to SQL."""
+        clause = self._rls_clauses.get(table_names)
+        if clause is None:
+            clause = " WHERE " + self.rls_where_fragment(table_names)
+            self._rls_clauses[table_names] = clause
+        return clause
+
+    def is_admin(self) -> bool:
+        """Check if user has admin role."""
+        return self._is_admin
@@ -5,10 +5,19 @@ Implements user permissions, roles, and authorization for secure query execution
 Based on ThoughtSpot/enterprise BI security patterns.
 """
 
-from typing import List, Dict, Any, Optional, Set
-from pydantic import BaseModel, Field
-from enum import Enum
+from typing import List, Dict, Any, Callable, Optional, Set, Tuple, FrozenSet, Union
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_serializer, field_validator, model_validator
+from collections import OrderedDict
+from enum import Enum, IntFlag
 from datetime import datetime
+import logging
+import sys
+import time
+
+# Compiled with mypyc when available; falls back to the pure-Python module
+from src.user._auth_fast import UserContextFast
+
+logger = logging.getLogger(__name__)
 
 
 class Role(str, Enum):
@@ -20,75 +29,103 @@ class Role(str, Enum):
     GUEST = "guest"              # Limited access
 
 
-class Permission(str, Enum):
-    """Granular permissions."""
+class Permission(IntFlag):
+    """
+    Granular permissions.
+    
+    Each permission is a single bit, so any set of permissions is one integer
+    mask and membership is a bitwise AND.
+    """
     # Query permissions
-    QUERY_DATA = "query_data"
-    VIEW_DATA = "view_data"
+    QUERY_DATA = 1 << 0
+    VIEW_DATA = 1 << 1
     
     # Semantic layer permissions
-    VIEW_METRICS = "view_metrics"
-    CREATE_METRICS = "create_metrics"
-    EDIT_METRICS = "edit_metrics"
-    DELETE_METRICS = "delete_metrics"
+    VIEW_METRICS = 1 << 2
+    CREATE_METRICS = 1 << 3
+    EDIT_METRICS = 1 << 4
+    DELETE_METRICS = 1 << 5
     
     # Table/column permissions
-    ACCESS_TABLE = "access_table"
-    ACCESS_COLUMN = "access_column"
+    ACCESS_TABLE = 1 << 6
+    ACCESS_COLUMN = 1 << 7
     
     # Admin permissions
-    MANAGE_USERS = "manage_users"
-    MANAGE_ROLES = "manage_roles"
-    MANAGE_RLS = "manage_rls"
-    VIEW_AUDIT_LOGS = "view_audit_logs"
+    MANAGE_USERS = 1 << 8
+    MANAGE_ROLES = 1 << 9
+    MANAGE_RLS = 1 << 10
+    VIEW_AUDIT_LOGS = 1 << 11
+    
+    def __str__(self) -> str:
+        """Render using the legacy string values, e.g. "query_data"."""
+        return "|".join(self.names())
+    
+    def names(self) -> List[str]:
+        """Legacy lower-case names of the set permissions, e.g. ["query_data"]."""
+        return [member.name.lower() for member in self if member.name]
+    
+    @classmethod
+    def from_iterable(cls, permissions: Any) -> "Permission":
+        """Fold Permission members or their legacy string names into one mask."""
+        mask = cls(0)
+        for perm in permissions:
+            if isinstance(perm, cls):
+                mask |= perm
+                continue
+            name = str(perm)
+            try:
+                mask |= cls[name.upper()]
+            except KeyError:
+                raise ValueError(f"Unknown permission: {name}") from None
+        return mask
 
 
 # Role hierarchy with default permissions
-ROLE_PERMISSIONS: Dict[Role, Set[Permission]] = {
-    Role.ADMIN: {
-        Permission.QUERY_DATA,
-        Permission.VIEW_DATA,
-        Permission.VIEW_METRICS,
-        Permission.CREATE_METRICS,
-        Permission.EDIT_METRICS,
-        Permission.DELETE_METRICS,
-        Permission.ACCESS_TABLE,
-        Permission.ACCESS_COLUMN,
-        Permission.MANAGE_USERS,
-        Permission.MANAGE_ROLES,
-        Permission.MANAGE_RLS,
-        Permission.VIEW_AUDIT_LOGS,
-    },
-    Role.ANALYST: {
-        Permission.QUERY_DATA,
-        Permission.VIEW_DATA,
-        Permission.VIEW_METRICS,
-        Permission.CREATE_METRICS,
-        Permission.ACCESS_TABLE,
-        Permission.ACCESS_COLUMN,
-    },
-    Role.VIEWER: {
-        Permission.VIEW_DATA,
-        Permission.VIEW_METRICS,
-    },
-    Role.DATA_ENGINEER: {
-        Permission.QUERY_DATA,
-        Permission.VIEW_DATA,
-        Permission.VIEW_METRICS,
-        Permission.CREATE_METRICS,
-        Permission.EDIT_METRICS,
-        Permission.DELETE_METRICS,
-        Permission.ACCESS_TABLE,
-        Permission.ACCESS_COLUMN,
-    },
-    Role.GUEST: {
-        Permission.VIEW_DATA,
-    }
+ROLE_PERMISSIONS: Dict[Role, Permission] = {
+    Role.ADMIN: (
+        Permission.QUERY_DATA
+        | Permission.VIEW_DATA
+        | Permission.VIEW_METRICS
+        | Permission.CREATE_METRICS
+        | Permission.EDIT_METRICS
+        | Permission.DELETE_METRICS
+        | Permission.ACCESS_TABLE
+        | Permission.ACCESS_COLUMN
+        | Permission.MANAGE_USERS
+        | Permission.MANAGE_ROLES
+        | Permission.MANAGE_RLS
+        | Permission.VIEW_AUDIT_LOGS
+    ),
+    Role.ANALYST: (
+        Permission.QUERY_DATA
+        | Permission.VIEW_DATA
+        | Permission.VIEW_METRICS
+        | Permission.CREATE_METRICS
+        | Permission.ACCESS_TABLE
+        | Permission.ACCESS_COLUMN
+    ),
+    Role.VIEWER: (
+        Permission.VIEW_DATA
+        | Permission.VIEW_METRICS
+    ),
+    Role.DATA_ENGINEER: (
+        Permission.QUERY_DATA
+        | Permission.VIEW_DATA
+        | Permission.VIEW_METRICS
+        | Permission.CREATE_METRICS
+        | Permission.EDIT_METRICS
+        | Permission.DELETE_METRICS
+        | Permission.ACCESS_TABLE
+        | Permission.ACCESS_COLUMN
+    ),
+    Role.GUEST: Permission.VIEW_DATA,
 }
 
 
 class TablePermission(BaseModel):
     """Permission to access a specific table."""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     table_name: str = Field(description="Table name")
     can_query: bool = Field(default=False, description="Can query this table")
     can_view: bool = Field(default=False, description="Can view this table in UI")
@@ -102,36 +139,101 @@ class RLSFilter(BaseModel):
     filter_condition: str = Field(description="SQL WHERE clause (without WHERE keyword)")
     description: Optional[str] = Field(default=None, description="Human-readable description")
     
-    class Config:
-        json_schema_extra = {
+    _table_name_lc: str = PrivateAttr(default="")
+    
+    model_config = ConfigDict(
+        frozen=True,
+        extra="forbid",
+        json_schema_extra={
             "example": {
                 "table_name": "orders",
                 "filter_condition": "region = 'US' AND order_date >= '2024-01-01'",
                 "description": "US orders from 2024 onwards"
             }
         }
+    )
+    
+    @model_validator(mode="after")
+    def _intern_table_name(self) -> "RLSFilter":
+        """Store the lower-cased table name once, interned for cheap comparisons."""
+        self._table_name_lc = sys.intern(self.table_name.lower())
+        return self
+    
+    @property
+    def table_name_lc(self) -> str:
+        """Lower-cased, interned table name."""
+        return self._table_name_lc
 
 
 class MetricPermission(BaseModel):
     """Permission to access specific metrics."""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     metric_name: str = Field(description="Metric name")
     can_view: bool = Field(default=True, description="Can view metric definition")
     can_query: bool = Field(default=True, description="Can query metric")
 
 
+def _build_fast_context(user: "UserContext") -> UserContextFast:
+    """Index a UserContext's roles and permission lists for the fast path."""
+    effective_mask = user.custom_permissions
+    for role in user.roles:
+        effective_mask |= ROLE_PERMISSIONS.get(role, Permission(0))
+    
+    # First matching entry wins, mirroring the original list scans
+    table_access: Dict[str, bool] = {}
+    allowed_columns: Dict[str, Optional[FrozenSet[str]]] = {}
+    denied_columns: Dict[str, FrozenSet[str]] = {}
+    for table_perm in user.table_permissions:
+        if table_perm.table_name in table_access:
+            continue
+        table_access[table_perm.table_name] = table_perm.can_query or table_perm.can_view
+        allowed_columns[table_perm.table_name] = (
+            frozenset(table_perm.allowed_columns) if table_perm.allowed_columns is not None else None
+        )
+        denied_columns[table_perm.table_name] = frozenset(table_perm.denied_columns or ())
+    
+    rls_by_table: Dict[str, List[str]] = {}
+    for f in user.rls_filters:
+        rls_by_table.setdefault(f.table_name, []).append(f.filter_condition)
+    
+    metric_access: Dict[str, bool] = {}
+    for metric_perm in user.metric_permissions:
+        metric_access.setdefault(metric_perm.metric_name, metric_perm.can_query)
+    
+    return UserContextFast(
+        user_id=user.user_id,
+        username=user.username,
+        roles=tuple(user.roles),
+        effective_mask=int(effective_mask),
+        is_admin=Role.ADMIN in user.roles,
+        has_query_data=bool(effective_mask & Permission.QUERY_DATA),
+        can_access_tables=bool(table_access) and bool(effective_mask & Permission.ACCESS_TABLE),
+        can_view_metrics=bool(effective_mask & Permission.VIEW_METRICS),
+        table_access=table_access,
+        allowed_columns=allowed_columns,
+        denied_columns=denied_columns,
+        rls_by_table={t: tuple(conds) for t, conds in rls_by_table.items()},
+        metric_access=metric_access,
+    )
+
+
 class UserContext(BaseModel):
     """
     Complete user context for authorization.
     
     Passed through entire query pipeline to enforce permissions.
+    Frozen because the indexed core and access memos assume fixed fields.
     """
+    model_config = ConfigDict(frozen=True)
+    
     user_id: str = Field(description="Unique user identifier")
     username: str = Field(description="Username")
     email: Optional[str] = Field(default=None, description="User email")
     
     # Roles and permissions
     roles: List[Role] = Field(description="User roles")
-    custom_permissions: Set[Permission] = Field(default_factory=set, description="Additional permissions")
+    custom_permissions: Permission = Field(default=Permission(0), description="Additional permissions (bit mask)")
     
     # Table-level permissions
     table_permissions: List[TablePermission] = Field(default_factory=list, description="Table access rules")
@@ -146,146 +248,320 @@ class UserContext(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow, description="Context creation time")
     session_id: Optional[str] = Field(default=None, description="Session identifier")
     
+    # Per-instance memo of access decisions. A UserContext lives for a single
+    # request/session, so results never need invalidating while it is alive.
+    _table_cache: Dict[str, bool] = PrivateAttr(default_factory=dict)
+    _col_cache: Dict[Tuple[str, str], bool] = PrivateAttr(default_factory=dict)
+    _metric_cache: Dict[str, bool] = PrivateAttr(default_factory=dict)
+    # Always set by _init_access_caches
+    _fast: UserContextFast = PrivateAttr()
+    _is_admin: bool = PrivateAttr(default=False)
+    _has_query_data: bool = PrivateAttr(default=False)
+    _filters_by_table_lc: Dict[str, Tuple[RLSFilter, ...]] = PrivateAttr(default_factory=dict)
+    
+    @field_validator("custom_permissions", mode="before")
+    @classmethod
+    def _fold_custom_permissions(cls, v: Any) -> Any:
+        """Accept the legacy set/list form and fold it into a bit mask."""
+        if isinstance(v, (set, frozenset, list, tuple)):
+            return Permission.from_iterable(v)
+        return v
+    
+    @field_serializer("custom_permissions")
+    def _serialize_custom_permissions(self, v: Permission) -> List[str]:
+        """Dump the mask in the legacy list-of-names form, e.g. ["query_data"]."""
+        return v.names()
+    
+    @model_validator(mode="after")
+    def _init_access_caches(self) -> "UserContext":
+        """Index permissions and reset memoized access decisions."""
+        self._fast = _build_fast_context(self)
+        self._is_admin = self._fast._is_admin
+        self._has_query_data = self._fast._has_query_data
+        self._table_cache = {}
+        self._col_cache = {}
+        self._metric_cache = {}
+        
+        filters_by_table: Dict[str, List[RLSFilter]] = {}
+        for f in self.rls_filters:
+            filters_by_table.setdefault(f.table_name_lc, []).append(f)
+        self._filters_by_table_lc = {t: tuple(fs) for t, fs in filters_by_table.items()}
+        return self
+    
+    @property
+    def filters_by_table_lc(self) -> Dict[str, Tuple[RLSFilter, ...]]:
+        """RLS filters indexed by lower-cased table name."""
+        return self._filters_by_table_lc
+    
+    def to_core(self) -> UserContextFast:
+        """Return the immutable, pre-indexed view used on hot paths."""
+        return self._fast
+    
     def has_permission(self, permission: Permission) -> bool:
         """Check if user has a specific permission."""
-        # Check custom permissions first
-        if permission in self.custom_permissions:
-            return True
-        
-        # Check role-based permissions
-        for role in self.roles:
-            if permission in ROLE_PERMISSIONS.get(role, set()):
-                return True
-        
-        return False
+        return self._fast.has_permission(permission)
     
     def can_access_table(self, table_name: str) -> bool:
         """Check if user can access a table."""
-        if not self.has_permission(Permission.ACCESS_TABLE):
-            return False
-        
-        # If no specific table permissions, deny by default
-        if not self.table_permissions:
-            return False
-        
-        # Check table-specific permissions
-        for perm in self.table_permissions:
-            if perm.table_name == table_name:
-                return perm.can_query or perm.can_view
+        allowed = self._table_cache.get(table_name)
+        if allowed is not None:
+            return allowed
         
-        return False
+        allowed = self._fast.can_access_table(table_name)
+        self._table_cache[table_name] = allowed
+        return allowed
     
     def can_access_column(self, table_name: str, column_name: str) -> bool:
         """Check if user can access a specific column."""
-        if not self.can_access_table(table_name):
-            return False
-        
-        # Find table permission
-        for perm in self.table_permissions:
-            if perm.table_name == table_name:
-                # Check denied columns
-                if perm.denied_columns and column_name in perm.denied_columns:
-                    return False
-                
-                # Check allowed columns
-                if perm.allowed_columns is not None:
-                    return column_name in perm.allowed_columns
-                
-                # If no specific column restrictions, allow
-                return True
-        
-        return False
+        key = (table_name, column_name)
+        allowed = self._col_cache.get(key)
+        if allowed is not None:
+            return allowed
+        
+        allowed = self._fast.can_access_column(table_name, column_name)
+        self._col_cache[key] = allowed
+        return allowed
     
     def can_access_metric(self, metric_name: str) -> bool:
         """Check if user can access a metric."""
-        if not self.has_permission(Permission.VIEW_METRICS):
-            return False
-        
-        # If no specific metric permissions, allow by default
-        if not self.metric_permissions:
-            return True
-        
-        # Check metric-specific permissions
-        for perm in self.metric_permissions:
-            if perm.metric_name == metric_name:
-                return perm.can_query
+        allowed = self._metric_cache.get(metric_name)
+        if allowed is not None:
+            return allowed
         
-        return True
+        allowed = self._fast.can_access_metric(metric_name)
+        self._metric_cache[metric_name] = allowed
+        return allowed
     
     def get_rls_filters_for_table(self, table_name: str) -> List[str]:
         """Get all RLS filter conditions for a table."""
-        return [
-            f.filter_condition
-            for f in self.rls_filters
-            if f.table_name == table_name
-        ]
+        return self._fast.get_rls_filters_for_table(table_name)
+    
+    def rls_where_for(self, table_name: str) -> Optional[str]:
+        """Get the pre-joined RLS condition for a table, or None if unfiltered."""
+        return self._fast.rls_where_for(table_name)
+    
+    def mentions_rls_table(self, sql_lower: str) -> bool:
+        """Check whether lower-cased SQL may reference an RLS-governed table."""
+        return self._fast.mentions_rls_table(sql_lower)
+    
+    def rls_where_fragment(self, table_names: Tuple[str, ...]) -> str:
+        """Get the joined RLS condition for several tables (memoized)."""
+        return self._fast.rls_where_fragment(table_names)
+    
+    def rls_where_clause(self, table_names: Tuple[str, ...]) -> str:
+        """Get the memoized " WHERE <fragment>" clause for several tables."""
+        return self._fast.rls_where_clause(table_names)
     
     def is_admin(self) -> bool:
         """Check if user has admin role."""
-        return Role.ADMIN in self.roles
+        return self._is_admin
+
+
+# Either the full pydantic context or its pre-indexed core can be validated
+AuthorizedUser = Union[UserContext, UserContextFast]
 
 
 class AuthorizationCache:
     """
     Cache for authorization checks to avoid repeated lookups.
     
-    Critical for performance in high-volume query scenarios.
+    Critical for performance in high-volume query scenarios. Entries are kept
+    in one map per resource type, keyed by user and then by resource, so each
+    type can have its own TTL and a user's entries are dropped in O(1).
     """
     
-    def __init__(self, ttl_seconds: int = 300):
+    def __init__(
+        self,
+        ttl_seconds: int = 300,
+        table_ttl_seconds: Optional[int] = None,
+        column_ttl_seconds: Optional[int] = None,
+        metric_ttl_seconds: Optional[int] = None,
+        max_entries_per_user: int = 1024
+    ):
         """
         Initialize cache.
         
         Args:
-            ttl_seconds: Time-to-live for cache entries
+            ttl_seconds: Default time-to-live for cache entries
+            table_ttl_seconds: TTL for table entries (defaults to ttl_seconds)
+            column_ttl_seconds: TTL for column entries (defaults to ttl_seconds)
+            metric_ttl_seconds: TTL for metric entries (defaults to ttl_seconds)
+            max_entries_per_user: Per-user, per-type cap; oldest entries are evicted
         """
         self.ttl_seconds = ttl_seconds
-        self._cache: Dict[str, Any] = {}
-        self._timestamps: Dict[str, datetime] = {}
-    
-    def _make_key(self, user_id: str, resource_type: str, resource_name: str) -> str:
-        """Generate cache key."""
-        return f"{user_id}:{resource_type}:{resource_name}"
-    
-    def _is_expired(self, key: str) -> bool:
-        """Check if cache entry is expired."""
-        if key not in self._timestamps:
-            return True
-        
-        age = (datetime.utcnow() - self._timestamps[key]).total_seconds()
-        return age > self.ttl_seconds
-    
-    def get(self, user_id: str, resource_type: str, resource_name: str) -> Optional[bool]:
-        """Get cached authorization result."""
-        key = self._make_key(user_id, resource_type, resource_name)
-        
-        if key in self._cache and not self._is_expired(key):
-            return self._cache[key]
-        
-        return None
-    
-    def set(self, user_id: str, resource_type: str, resource_name: str, allowed: bool):
-        """Cache authorization result."""
-        key = self._make_key(user_id, resource_type, resource_name)
-        self._cache[key] = allowed
-        self._timestamps[key] = datetime.utcnow()
+        self.table_ttl_seconds = table_ttl_seconds if table_ttl_seconds is not None else ttl_seconds
+        self.column_ttl_seconds = column_ttl_seconds if column_ttl_seconds is not None else ttl_seconds
+        self.metric_ttl_seconds = metric_ttl_seconds if metric_ttl_seconds is not None else ttl_seconds
+        self.max_entries_per_user = max_entries_per_user
+        
+        # user_id -> resource key -> (expires_at, allowed)
+        self._table: Dict[str, OrderedDict[str, Tuple[float, bool]]] = {}
+        self._column: Dict[str, OrderedDict[Tuple[str, str], Tuple[float, bool]]] = {}
+        self._metric: Dict[str, OrderedDict[str, Tuple[float, bool]]] = {}
+        
+        # Reverse index for cascading invalidation when a role changes. Only
+        # users with cached entries are indexed; _roles_by_user is the forward
+        # side, used to re-index on a role change and prune on invalidation.
+        self._users_by_role: Dict[Role, Set[str]] = {}
+        self._roles_by_user: Dict[str, FrozenSet[Role]] = {}
+        
+        # Called as callback(user_id, role) after every published change,
+        # e.g. to fan the event out to other workers over Redis Pub/Sub
+        self.on_invalidate: List[Callable[[Optional[str], Optional[Role]], None]] = []
+    
+    def _lookup(self, store: Dict[str, OrderedDict], user_id: str, key: Any) -> Optional[bool]:
+        """Return a live entry, dropping it if expired."""
+        entries = store.get(user_id)
+        if not entries:
+            return None
+        
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, allowed = entry
+        if time.monotonic() > expires_at:
+            del entries[key]
+            if not entries:
+                del store[user_id]
+                if not any(user_id in s for s in (self._table, self._column, self._metric)):
+                    self._unregister_user(user_id)
+            return None
+        
+        return allowed
+    
+    def _store(
+        self,
+        store: Dict[str, OrderedDict],
+        user_id: str,
+        key: Any,
+        allowed: bool,
+        ttl_seconds: int
+    ):
+        """Insert an entry, evicting the user's oldest one when over the cap."""
+        entries = store.get(user_id)
+        if entries is None:
+            entries = store[user_id] = OrderedDict()
+        
+        entries[key] = (time.monotonic() + ttl_seconds, allowed)
+        entries.move_to_end(key)
+        if len(entries) > self.max_entries_per_user:
+            entries.popitem(last=False)
+    
+    def get_table(self, user_id: str, table_name: str) -> Optional[bool]:
+        """Get cached table authorization result."""
+        return self._lookup(self._table, user_id, table_name)
+    
+    def set_table(self, user_id: str, table_name: str, allowed: bool):
+        """Cache table authorization result."""
+        self._store(self._table, user_id, table_name, allowed, self.table_ttl_seconds)
+    
+    def get_column(self, user_id: str, table_name: str, column_name: str) -> Optional[bool]:
+        """Get cached column authorization result."""
+        return self._lookup(self._column, user_id, (table_name, column_name))
+    
+    def set_column(self, user_id: str, table_name: str, column_name: str, allowed: bool):
+        """Cache column authorization result."""
+        self._store(
+            self._column, user_id, (table_name, column_name), allowed, self.column_ttl_seconds
+        )
+    
+    def get_metric(self, user_id: str, metric_name: str) -> Optional[bool]:
+        """Get cached metric authorization result."""
+        return self._lookup(self._metric, user_id, metric_name)
+    
+    def set_metric(self, user_id: str, metric_name: str, allowed: bool):
+        """Cache metric authorization result."""
+        self._store(self._metric, user_id, metric_name, allowed, self.metric_ttl_seconds)
     
     def invalidate(self, user_id: Optional[str] = None):
         """Invalidate cache entries."""
         if user_id:
             # Invalidate all entries for a specific user
-            keys_to_remove = [k for k in self._cache.keys() if k.startswith(f"{user_id}:")]
-            for key in keys_to_remove:
-                del self._cache[key]
-                del self._timestamps[key]
+            self._table.pop(user_id, None)
+            self._column.pop(user_id, None)
+            self._metric.pop(user_id, None)
+            self._unregister_user(user_id)
         else:
             # Invalidate entire cache
-            self._cache.clear()
-            self._timestamps.clear()
+            self._table.clear()
+            self._column.clear()
+            self._metric.clear()
+            self._users_by_role.clear()
+            self._roles_by_user.clear()
+    
+    def register_user(self, user_id: str, roles: Any):
+        """Record a user's roles so role-level changes can cascade to them."""
+        roles = frozenset(roles)
+        old_roles = self._roles_by_user.get(user_id)
+        if old_roles == roles:
+            return
+        
+        # Re-index on a role change: drop the user from roles it no longer has
+        if old_roles:
+            self._drop_from_roles(user_id, old_roles - roles)
+        for role in roles:
+            self._users_by_role.setdefault(role, set()).add(user_id)
+        self._roles_by_user[user_id] = roles
+    
+    def _unregister_user(self, user_id: str):
+        """Remove a user with no cached entries from the role index."""
+        roles = self._roles_by_user.pop(user_id, None)
+        if roles:
+            self._drop_from_roles(user_id, roles)
+    
+    def _drop_from_roles(self, user_id: str, roles: FrozenSet[Role]):
+        """Remove a user from the given roles' user sets, dropping empty sets."""
+        for role in roles:
+            users = self._users_by_role.get(role)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del self._users_by_role[role]
+    
+    def subscribe(self, callback: Callable[[Optional[str], Optional[Role]], None]):
+        """Register a callback fired after each published change."""
+        self.on_invalidate.append(callback)
+    
+    def publish_change(
+        self,
+        user_id: Optional[str] = None,
+        role: Optional[Role] = None,
+        notify: bool = True
+    ):
+        """
+        Invalidate entries affected by an upstream permission change.
+        
+        Args:
+            user_id: User whose roles/filters changed
+            role: Role whose permissions changed; cascades to every registered user
+            notify: Fire on_invalidate callbacks. Pass False when applying an
+                event received from another process to avoid echoing it back.
+        """
+        if user_id is None and role is None:
+            self.invalidate()
+        else:
+            if user_id is not None:
+                self.invalidate(user_id)
+            if role is not None:
+                # Copied: invalidating a user prunes it from this set
+                for affected_user in tuple(self._users_by_role.get(role, ())):
+                    self.invalidate(affected_user)
+        
+        if notify:
+            for callback in self.on_invalidate:
+                try:
+                    callback(user_id, role)
+                except Exception as e:
+                    logger.error(f"Authorization invalidation callback failed: {e}")
     
     def size(self) -> int:
         """Get cache size."""
-        return len(self._cache)
+        return sum(
+            len(entries)
+            for store in (self._table, self._column, self._metric)
+            for entries in store.values()
+        )
 
 
 class AuthorizationValidator:
@@ -306,7 +582,7 @@ class AuthorizationValidator:
     
     def validate_table_access(
         self,
-        user: UserContext,
+        user: AuthorizedUser,
         table_name: str,
         operation: str = "query"
     ) -> tuple[bool, Optional[str]]:
@@ -314,16 +590,20 @@ class AuthorizationValidator:
         Validate user can access a table.
         
         Args:
-            user: User context
+            user: User context (or its pre-indexed core)
             table_name: Table to access
             operation: Operation type (query, view)
         
         Returns:
             Tuple of (is_allowed, error_message)
         """
+        # Admins always pass; keep trivially-true entries out of the cache
+        if user._is_admin:
+            return True, None
+        
         # Check cache first
         if self.cache:
-            cached = self.cache.get(user.user_id, "table", table_name)
+            cached = self.cache.get_table(user.user_id, table_name)
             if cached is not None:
                 return cached, None if cached else f"Access denied to table: {table_name}"
         
@@ -332,7 +612,8 @@ class AuthorizationValidator:
         
         # Cache result
         if self.cache:
-            self.cache.set(user.user_id, "table", table_name, allowed)
+            self.cache.register_user(user.user_id, user.roles)
+            self.cache.set_table(user.user_id, table_name, allowed)
         
         if not allowed:
             return False, f"User {user.username} does not have access to table: {table_name}"
@@ -341,7 +622,7 @@ class AuthorizationValidator:
     
     def validate_column_access(
         self,
-        user: UserContext,
+        user: AuthorizedUser,
         table_name: str,
         column_name: str
     ) -> tuple[bool, Optional[str]]:
@@ -349,17 +630,20 @@ class AuthorizationValidator:
         Validate user can access a column.
         
         Args:
-            user: User context
+            user: User context (or its pre-indexed core)
             table_name: Table name
             column_name: Column name
         
         Returns:
             Tuple of (is_allowed, error_message)
         """
+        # Admins always pass; keep trivially-true entries out of the cache
+        if user._is_admin:
+            return True, None
+        
         # Check cache
-        cache_key = f"{table_name}.{column_name}"
         if self.cache:
-            cached = self.cache.get(user.user_id, "column", cache_key)
+            cached = self.cache.get_column(user.user_id, table_name, column_name)
             if cached is not None:
                 return cached, None if cached else f"Access denied to column: {table_name}.{column_name}"
         
@@ -368,7 +652,8 @@ class AuthorizationValidator:
         
         # Cache result
         if self.cache:
-            self.cache.set(user.user_id, "column", cache_key, allowed)
+            self.cache.register_user(user.user_id, user.roles)
+            self.cache.set_column(user.user_id, table_name, column_name, allowed)
         
         if not allowed:
             return False, f"User {user.username} does not have access to column: {table_name}.{column_name}"
@@ -377,22 +662,26 @@ class AuthorizationValidator:
     
     def validate_metric_access(
         self,
-        user: UserContext,
+        user: AuthorizedUser,
         metric_name: str
     ) -> tuple[bool, Optional[str]]:
         """
         Validate user can access a metric.
         
         Args:
-            user: User context
+            user: User context (or its pre-indexed core)
             metric_name: Metric name
         
         Returns:
             Tuple of (is_allowed, error_message)
         """
+        # Admins always pass; keep trivially-true entries out of the cache
+        if user._is_admin:
+            return True, None
+        
         # Check cache
         if self.cache:
-            cached = self.cache.get(user.user_id, "metric", metric_name)
+            cached = self.cache.get_metric(user.user_id, metric_name)
             if cached is not None:
                 return cached, None if cached else f"Access denied to metric: {metric_name}"
         
@@ -401,24 +690,25 @@ class AuthorizationValidator:
         
         # Cache result
         if self.cache:
-            self.cache.set(user.user_id, "metric", metric_name, allowed)
+            self.cache.register_user(user.user_id, user.roles)
+            self.cache.set_metric(user.user_id, metric_name, allowed)
         
         if not allowed:
             return False, f"User {user.username} does not have access to metric: {metric_name}"
         
         return True, None
     
-    def validate_query_permission(self, user: UserContext) -> tuple[bool, Optional[str]]:
+    def validate_query_permission(self, user: AuthorizedUser) -> tuple[bool, Optional[str]]:
         """
         Validate user can execute queries.
         
         Args:
-            user: User context
+            user: User context (or its pre-indexed core)
         
         Returns:
             Tuple of (is_allowed, error_message)
         """
-        if not user.has_permission(Permission.QUERY_DATA):
+        if not user._has_query_data:
             return False, f"User {user.username} does not have permission to query data"
         
         return True, None
@@ -427,6 +717,16 @@ class AuthorizationValidator:
         """Invalidate authorization cache."""
         if self.cache:
             self.cache.invalidate(user_id)
+    
+    def register(self, user: AuthorizedUser):
+        """Register a user's roles for cascading role-change invalidation."""
+        if self.cache:
+            self.cache.register_user(user.user_id, user.roles)
+    
+    def publish_change(self, user_id: Optional[str] = None, role: Optional[Role] = None):
+        """Invalidate cached decisions after a user or role permission change."""
+        if self.cache:
+            self.cache.publish_change(user_id=user_id, role=role)
 
 
 # Global singleton instances
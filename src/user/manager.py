@@ -10,6 +10,8 @@ import hashlib
 from typing import List, Optional
 from datetime import datetime
 
+from pydantic import TypeAdapter
+
 from src.user.models import (
     UserProfile, UserRole, CreateUserRequest, 
     UpdateUserRequest, ROLE_GOAL_SUGGESTIONS
@@ -20,6 +22,9 @@ logger = logging.getLogger(__name__)
 
 _user_manager = None
 
+# Compiled once so bulk listings validate every row against a single schema
+_USER_PROFILE_LIST_ADAPTER = TypeAdapter(List[UserProfile])
+
 
 class UserManager:
     """Manages user profiles with roles and goals."""
@@ -106,21 +111,25 @@ class UserManager:
             # Fall back to SHA-256 for legacy passwords
             return hashlib.sha256(password.encode()).hexdigest() == password_hash
     
+    def _row_to_profile_data(self, row: dict) -> dict:
+        """Map a database row onto UserProfile fields."""
+        return {
+            'id': str(row['id']),  # Convert SERIAL id to string
+            'username': row['username'],
+            'email': row['email'],
+            'full_name': row.get('full_name') or '',
+            'role': row.get('role') or UserRole.ANALYST,
+            'goals': row.get('goals') or [],
+            'department': row.get('department'),
+            'preferences': row.get('preferences') or {},
+            'is_active': row.get('is_active', True),
+            'created_at': row.get('created_at'),
+            'updated_at': row.get('updated_at')
+        }
+    
     def _row_to_profile(self, row: dict) -> UserProfile:
         """Convert database row to UserProfile."""
-        return UserProfile(
-            id=str(row['id']),  # Convert SERIAL id to string
-            username=row['username'],
-            email=row['email'],
-            full_name=row.get('full_name') or '',
-            role=UserRole(row['role']) if row.get('role') else UserRole.ANALYST,
-            goals=row.get('goals') or [],
-            department=row.get('department'),
-            preferences=row.get('preferences') or {},
-            is_active=row.get('is_active', True),
-            created_at=row.get('created_at'),
-            updated_at=row.get('updated_at')
-        )
+        return UserProfile(**self._row_to_profile_data(row))
     
     def create_user(self, request: CreateUserRequest) -> UserProfile:
         """Create a new user."""
@@ -227,9 +236,10 @@ class UserManager:
             if not rows:
                 return []
             
-            # Use the helper method to properly convert each row
-            users = [self._row_to_profile(row) for row in rows]
-            return users
+            # Validate all rows in one pass with the precompiled list schema
+            return _USER_PROFILE_LIST_ADAPTER.validate_python(
+                [self._row_to_profile_data(row) for row in rows]
+            )
         
         except Exception as e:
             logger.error(f"Failed to list users: {e}")
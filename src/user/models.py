@@ -6,7 +6,7 @@ Models for user profiles with roles and goals.
 
 from datetime import datetime
 from typing import Optional, List
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_serializer, field_validator
 import re
 from enum import Enum
 
@@ -48,10 +48,12 @@ class UserProfile(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
+    @field_serializer('created_at', 'updated_at', when_used='json')
+    def serialize_timestamp(self, v: datetime) -> str:
+        """Dump timestamps as ISO 8601 strings."""
+        return v.isoformat()
 
 
 class CreateUserRequest(BaseModel):
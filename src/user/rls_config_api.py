@@ -5,23 +5,125 @@ Provides endpoints for managing user-level RLS filters, roles, and permissions.
 Allows administrators to configure fine-grained access control per user and connection.
 """
 
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any, Tuple
+from collections import OrderedDict
 from datetime import datetime
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, model_validator
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
-from src.api.auth import get_current_user, require_role
-from src.api.models import User
+from src.api.auth import get_current_user, require_admin
 from src.database.connection import get_db
 from src.user.authorization import Role as UserRole, RLSFilter
-import json
+from src.user.rls_loader import FilterOperator, _build_filter_condition, bump_rls_config_version
+import asyncio
 import logging
+import time
+
+import orjson
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/v1/rls", tags=["RLS Configuration"])
+router = APIRouter(
+    prefix="/api/v1/rls",
+    tags=["RLS Configuration"],
+    default_response_class=ORJSONResponse
+)
+
+
+# Allowed values (validated by pydantic-core; mirror the table CHECK constraints).
+# FilterOperator lives in rls_loader, which also checks stored rows against it.
+ConnectionRole = Literal['ADMIN', 'ANALYST', 'VIEWER', 'EXTERNAL', 'CUSTOM']
+
+
+# SQL Statements (compiled once at import)
+# Read-only selects run directly on asyncpg, so they use $n placeholders
+_PG_GET_FILTERS = """
+    SELECT id, user_id, connection_id, table_name, column_name, operator, filter_value,
+           is_active, created_at, updated_at, created_by
+    FROM user_rls_filters
+    WHERE user_id = $1 AND connection_id = $2 AND (is_active OR $3::boolean)
+    ORDER BY table_name, column_name
+"""
+
+_Q_CREATE_FILTER = text("""
+    INSERT INTO user_rls_filters 
+    (user_id, connection_id, table_name, column_name, operator, filter_value, created_by)
+    VALUES (:user_id, :connection_id, :table_name, :column_name, :operator, :filter_value, :created_by)
+    ON CONFLICT (user_id, connection_id, table_name, column_name) 
+    DO UPDATE SET 
+        operator = EXCLUDED.operator,
+        filter_value = EXCLUDED.filter_value,
+        updated_at = CURRENT_TIMESTAMP,
+        is_active = TRUE
+    RETURNING id, user_id, connection_id, table_name, column_name, operator, filter_value, 
+              is_active, created_at, updated_at, created_by
+""")
+
+# prev captures the pre-update values for the audit log in the same round-trip
+_Q_UPDATE_FILTER = text("""
+    WITH prev AS (
+        SELECT id, operator, filter_value, is_active
+        FROM user_rls_filters
+        WHERE id = :id
+        FOR UPDATE
+    )
+    UPDATE user_rls_filters f
+    SET operator = COALESCE(:operator, f.operator),
+        filter_value = COALESCE(:filter_value, f.filter_value),
+        is_active = COALESCE(:is_active, f.is_active),
+        updated_at = CURRENT_TIMESTAMP
+    FROM prev
+    WHERE f.id = prev.id
+    RETURNING f.id, f.user_id, f.connection_id, f.table_name, f.column_name, f.operator, f.filter_value,
+              f.is_active, f.created_at, f.updated_at, f.created_by,
+              prev.operator, prev.filter_value, prev.is_active
+""")
+
+_Q_DELETE_FILTER = text("DELETE FROM user_rls_filters WHERE id = :id RETURNING user_id, connection_id")
+
+_ROLES_SELECT = """
+    SELECT id, user_id, connection_id, role, is_active, created_at, updated_at, created_by
+    FROM user_connection_roles
+    WHERE user_id = $1 AND is_active = TRUE"""
+
+_PG_GET_ROLES = _ROLES_SELECT
+_PG_GET_ROLES_FOR_CONNECTION = _ROLES_SELECT + " AND connection_id = $2"
+
+_Q_ASSIGN_ROLE = text("""
+    INSERT INTO user_connection_roles (user_id, connection_id, role, created_by)
+    VALUES (:user_id, :connection_id, :role, :created_by)
+    ON CONFLICT (user_id, connection_id)
+    DO UPDATE SET 
+        role = EXCLUDED.role,
+        updated_at = CURRENT_TIMESTAMP,
+        is_active = TRUE
+    RETURNING id, user_id, connection_id, role, is_active, created_at, updated_at, created_by
+""")
+
+_Q_USER_RLS_CONFIG = text("""
+    WITH u AS (
+        SELECT username FROM users WHERE id = :user_id
+    ),
+    r AS (
+        SELECT role FROM user_connection_roles
+        WHERE user_id = :user_id AND connection_id = :connection_id AND is_active = TRUE
+    ),
+    f AS (
+        SELECT jsonb_agg(to_jsonb(x) ORDER BY x.table_name, x.column_name) AS j
+        FROM user_rls_filters x
+        WHERE user_id = :user_id AND connection_id = :connection_id AND is_active = TRUE
+    ),
+    p AS (
+        SELECT jsonb_agg(to_jsonb(y)) AS j
+        FROM user_table_permissions y
+        WHERE user_id = :user_id AND connection_id = :connection_id AND is_active = TRUE
+    )
+    SELECT u.username, r.role, f.j, p.j
+    FROM u LEFT JOIN r ON TRUE LEFT JOIN f ON TRUE LEFT JOIN p ON TRUE
+""")
 
 
 # Pydantic Models
@@ -31,30 +133,29 @@ class RLSFilterCreate(BaseModel):
     connection_id: int = Field(..., description="Database connection ID")
     table_name: str = Field(..., description="Table name for the filter")
     column_name: str = Field(..., description="Column name for the filter")
-    operator: str = Field(..., description="Filter operator (=, !=, IN, etc.)")
+    operator: FilterOperator = Field(..., description="Filter operator (=, !=, IN, etc.)")
     filter_value: Any = Field(..., description="Filter value (string, number, or array)")
     
-    @validator('operator')
-    def validate_operator(cls, v):
-        valid_operators = ['=', '!=', '>', '<', '>=', '<=', 'IN', 'NOT IN', 'LIKE', 'NOT LIKE', 'IS NULL', 'IS NOT NULL']
-        if v not in valid_operators:
-            raise ValueError(f'Operator must be one of: {", ".join(valid_operators)}')
-        return v
+    @model_validator(mode="after")
+    def _check_renderable(self) -> "RLSFilterCreate":
+        """Reject filters the RLS loader could not turn into SQL."""
+        _build_filter_condition(self.column_name, self.operator, self.filter_value)
+        return self
 
 
 class RLSFilterUpdate(BaseModel):
     """Request model for updating RLS filter"""
-    operator: Optional[str] = None
+    operator: Optional[FilterOperator] = None
     filter_value: Optional[Any] = None
     is_active: Optional[bool] = None
     
-    @validator('operator')
-    def validate_operator(cls, v):
-        if v is not None:
-            valid_operators = ['=', '!=', '>', '<', '>=', '<=', 'IN', 'NOT IN', 'LIKE', 'NOT LIKE', 'IS NULL', 'IS NOT NULL']
-            if v not in valid_operators:
-                raise ValueError(f'Operator must be one of: {", ".join(valid_operators)}')
-        return v
+    @model_validator(mode="after")
+    def _check_renderable(self) -> "RLSFilterUpdate":
+        """Reject an operator/value pair the RLS loader could not turn into SQL."""
+        # A lone operator or value is checked against the stored row on update
+        if self.operator is not None and self.filter_value is not None:
+            _build_filter_condition("column", self.operator, self.filter_value)
+        return self
 
 
 class RLSFilterResponse(BaseModel):
@@ -76,28 +177,13 @@ class UserRoleCreate(BaseModel):
     """Request model for assigning user role"""
     user_id: int = Field(..., description="User ID")
     connection_id: int = Field(..., description="Database connection ID")
-    role: str = Field(..., description="Role name (ADMIN, ANALYST, VIEWER, etc.)")
-    
-    @validator('role')
-    def validate_role(cls, v):
-        valid_roles = ['ADMIN', 'ANALYST', 'VIEWER', 'EXTERNAL', 'CUSTOM']
-        if v not in valid_roles:
-            raise ValueError(f'Role must be one of: {", ".join(valid_roles)}')
-        return v
+    role: ConnectionRole = Field(..., description="Role name (ADMIN, ANALYST, VIEWER, etc.)")
 
 
 class UserRoleUpdate(BaseModel):
     """Request model for updating user role"""
-    role: Optional[str] = None
+    role: Optional[ConnectionRole] = None
     is_active: Optional[bool] = None
-    
-    @validator('role')
-    def validate_role(cls, v):
-        if v is not None:
-            valid_roles = ['ADMIN', 'ANALYST', 'VIEWER', 'EXTERNAL', 'CUSTOM']
-            if v not in valid_roles:
-                raise ValueError(f'Role must be one of: {", ".join(valid_roles)}')
-        return v
 
 
 class UserRoleResponse(BaseModel):
@@ -161,22 +247,274 @@ class UserRLSConfigResponse(BaseModel):
 
 
 # Helper Functions
-def serialize_filter_value(value: Any) -> str:
-    """Serialize filter value to JSON string"""
-    if isinstance(value, (list, dict)):
-        return json.dumps(value)
-    elif isinstance(value, str):
-        return json.dumps(value)
-    else:
-        return json.dumps(value)
-
-
-def deserialize_filter_value(value: str) -> Any:
-    """Deserialize filter value from JSON string"""
-    try:
-        return json.loads(value)
-    except:
-        return value
+class _ConfigCache:
+    """
+    Process-local TTL cache of user RLS configuration keyed by (user_id, connection_id).
+    
+    Mutating endpoints invalidate affected entries; the TTL bounds staleness for
+    changes made by other workers or outside this API.
+    """
+    
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 10_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[float, UserRLSConfigResponse]]" = OrderedDict()
+        self._locks: Dict[Tuple[int, int], asyncio.Lock] = {}
+    
+    def get(self, key: Tuple[int, int]) -> Optional[UserRLSConfigResponse]:
+        """Return a fresh cached config, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, config = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self._release_lock(key)
+            return None
+        return config
+    
+    def set(self, key: Tuple[int, int], config: UserRLSConfigResponse):
+        """Cache a config, evicting the oldest entries beyond max_entries."""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, config)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._release_lock(evicted)
+    
+    def lock(self, key: Tuple[int, int]) -> asyncio.Lock:
+        """Per-key lock so concurrent misses load the config once."""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+    
+    def invalidate(self, user_id: int, connection_id: int):
+        """Drop the cached config for a user and connection."""
+        key = (user_id, connection_id)
+        self._entries.pop(key, None)
+        self._release_lock(key)
+    
+    def _release_lock(self, key: Tuple[int, int]):
+        """Forget a key's lock once it is neither held nor guarding a cached entry."""
+        lock = self._locks.get(key)
+        if lock is not None and not lock.locked() and key not in self._entries:
+            del self._locks[key]
+
+
+_config_cache = _ConfigCache()
+
+
+def _current_user_id(current_user: dict) -> int:
+    """users.id of the authenticated user; get_current_user returns it as a string."""
+    return int(current_user['user_id'])
+
+
+async def _fetch_raw(db: AsyncSession, query: str, *args):
+    """Run a read query on the session's underlying asyncpg connection, skipping the Core row layer."""
+    conn = await db.connection()
+    raw_conn = await conn.get_raw_connection()
+    return await raw_conn.driver_connection.fetch(query, *args)
+
+
+async def _fetch_filters_rows(
+    db: AsyncSession,
+    user_id: int,
+    connection_id: int,
+    include_inactive: bool = False
+):
+    """Fetch RLS filter records for a user and connection, ordered by table and column."""
+    return await _fetch_raw(db, _PG_GET_FILTERS, user_id, connection_id, bool(include_inactive))
+
+
+async def _load_user_rls_config(db: AsyncSession, user_id: int, connection_id: int) -> UserRLSConfigResponse:
+    """Load a user's role, filters, and table permissions for a connection in one query."""
+    # One round-trip: user, role, and filter/permission rows aggregated as JSONB
+    result = await db.execute(
+        _Q_USER_RLS_CONFIG,
+        {'user_id': user_id, 'connection_id': connection_id}
+    )
+    config_row = result.fetchone()
+    
+    if not config_row:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    username, role, filter_items, perm_items = config_row
+    
+    # JSONB aggregates carry timestamps as ISO strings, so these rows still need validation
+    filters = [RLSFilterResponse.model_validate(item) for item in filter_items or ()]
+    
+    table_permissions = []
+    for item in perm_items or ():
+        # allowed/denied columns are TEXT columns holding JSON arrays
+        item['allowed_columns'] = orjson.loads(item['allowed_columns']) if item['allowed_columns'] else None
+        item['denied_columns'] = orjson.loads(item['denied_columns']) if item['denied_columns'] else None
+        table_permissions.append(TablePermissionResponse.model_validate(item))
+    
+    return UserRLSConfigResponse(
+        user_id=user_id,
+        username=username,
+        connection_id=connection_id,
+        role=role,
+        rls_filters=filters,
+        table_permissions=table_permissions
+    )
+
+
+# Columns written by the audit writer, in record-tuple order
+_AUDIT_COLUMNS = [
+    'user_id', 'connection_id', 'action', 'entity_type', 'entity_id',
+    'old_value', 'new_value', 'performed_by', 'ip_address', 'user_agent'
+]
+
+_AUDIT_INSERT = text("""
+    INSERT INTO rls_configuration_audit 
+    (user_id, connection_id, action, entity_type, entity_id, old_value, new_value, performed_by, ip_address, user_agent)
+    VALUES (:user_id, :connection_id, :action, :entity_type, :entity_id, :old_value, :new_value, :performed_by, :ip_address, :user_agent)
+""")
+
+
+class AuditWriter:
+    """
+    Background writer for RLS configuration audit records.
+    
+    Endpoints enqueue records without touching the database; a single task
+    drains the queue and writes each batch with one PostgreSQL COPY.
+    """
+    
+    _STOP = object()
+    
+    def __init__(
+        self,
+        batch_size: int = 500,
+        flush_interval: float = 0.1,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5
+    ):
+        """
+        Initialize writer.
+        
+        Args:
+            batch_size: Maximum records per COPY
+            flush_interval: Seconds to wait for a batch to fill before flushing
+            max_retries: INSERT attempts for a batch whose COPY failed
+            retry_backoff: Base delay in seconds between INSERT attempts
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._engine: Optional[AsyncEngine] = None
+    
+    @property
+    def running(self) -> bool:
+        """Whether the background task is accepting records."""
+        return self._task is not None and not self._task.done()
+    
+    def start(self):
+        """Start the background task on the running event loop."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        logger.info("RLS audit writer started")
+    
+    async def stop(self):
+        """Flush queued records and stop the background task."""
+        if not self.running:
+            return
+        self._queue.put_nowait(self._STOP)
+        await self._task
+        self._task = None
+        logger.info("RLS audit writer stopped")
+    
+    def enqueue(self, engine: AsyncEngine, record: tuple) -> bool:
+        """
+        Queue an audit record without blocking.
+        
+        Returns:
+            False if the writer is not running and the caller must write inline
+        """
+        if not self.running:
+            return False
+        if self._engine is None:
+            self._engine = engine
+        self._queue.put_nowait(record)
+        return True
+    
+    async def _run(self):
+        """Collect records into batches and flush them until stopped."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            record = await self._queue.get()
+            if record is self._STOP:
+                break
+            
+            batch = [record]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                if record is self._STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+            
+            await self._flush(batch)
+    
+    async def _flush(self, batch: List[tuple]):
+        """
+        Write a batch of records with a single COPY.
+        
+        The audited changes are already committed, so a failed COPY is
+        retried as an executemany INSERT, up to max_retries times with
+        backoff, before the batch is dropped.
+        """
+        try:
+            async with self._engine.connect() as conn:
+                raw_conn = await conn.get_raw_connection()
+                await raw_conn.driver_connection.copy_records_to_table(
+                    'rls_configuration_audit',
+                    records=batch,
+                    columns=_AUDIT_COLUMNS
+                )
+            return
+        except Exception as e:
+            logger.warning(f"COPY of {len(batch)} RLS audit records failed, falling back to INSERT: {e}")
+        
+        params = [dict(zip(_AUDIT_COLUMNS, record, strict=True)) for record in batch]
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                async with self._engine.begin() as conn:
+                    await conn.execute(_AUDIT_INSERT, params)
+                return
+            except Exception as e:
+                logger.warning(
+                    f"INSERT of {len(batch)} RLS audit records failed "
+                    f"(attempt {attempt}/{self.max_retries}): {e}"
+                )
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.retry_backoff * attempt)
+        
+        logger.error(f"Dropped {len(batch)} RLS audit records after {self.max_retries} INSERT attempts")
+
+
+_audit_writer: Optional[AuditWriter] = None
+
+
+def get_audit_writer() -> AuditWriter:
+    """Get global audit writer instance."""
+    global _audit_writer
+    if _audit_writer is None:
+        _audit_writer = AuditWriter()
+    return _audit_writer
 
 
 async def log_audit(
@@ -189,34 +527,54 @@ async def log_audit(
     old_value: Optional[Dict] = None,
     new_value: Optional[Dict] = None,
     performed_by: int = None,
-    request: Request = None
+    request: Request = None,
+    new_value_json: Optional[str] = None
 ):
-    """Log RLS configuration change to audit table"""
-    try:
-        ip_address = request.client.host if request else None
-        user_agent = request.headers.get('user-agent') if request else None
-        
-        query = text("""
-            INSERT INTO rls_configuration_audit 
-            (user_id, connection_id, action, entity_type, entity_id, old_value, new_value, performed_by, ip_address, user_agent)
-            VALUES (:user_id, :connection_id, :action, :entity_type, :entity_id, :old_value, :new_value, :performed_by, :ip_address, :user_agent)
-        """)
-        
-        await db.execute(query, {
-            'user_id': user_id,
-            'connection_id': connection_id,
-            'action': action,
-            'entity_type': entity_type,
-            'entity_id': entity_id,
-            'old_value': json.dumps(old_value) if old_value else None,
-            'new_value': json.dumps(new_value) if new_value else None,
-            'performed_by': performed_by,
-            'ip_address': ip_address,
-            'user_agent': user_agent
-        })
-        await db.commit()
-    except Exception as e:
-        logger.error(f"Failed to log audit: {e}")
+    """
+    Log RLS configuration change to audit table.
+    
+    Must be called before the caller commits. Records are queued for the
+    background audit writer when that commit succeeds; if the writer is not
+    running (e.g. outside the API lifespan) the record is inserted inline in
+    the caller's transaction, so a failed audit insert fails the change.
+    Pass new_value_json instead of new_value when the payload is already serialized.
+    """
+    ip_address = request.client.host if request else None
+    user_agent = request.headers.get('user-agent') if request else None
+    
+    # Serialize once, at enqueue time
+    if new_value_json is None and new_value:
+        new_value_json = orjson.dumps(new_value).decode()
+    
+    record = (
+        user_id,
+        connection_id,
+        action,
+        entity_type,
+        entity_id,
+        orjson.dumps(old_value).decode() if old_value else None,
+        new_value_json,
+        performed_by,
+        ip_address,
+        user_agent
+    )
+    
+    writer = get_audit_writer()
+    if writer.running:
+        # Queue only once the caller's change is durable; a rollback first
+        # discards the record so a later commit on the session can't log it
+        pending = [record]
+        
+        def enqueue_committed(session):
+            if pending:
+                writer.enqueue(db.bind, pending.pop())
+        
+        event.listen(db.sync_session, 'after_commit', enqueue_committed, once=True)
+        event.listen(db.sync_session, 'after_rollback', lambda session: pending.clear(), once=True)
+        return
+    
+    # Joins the caller's transaction; the caller commits
+    await db.execute(_AUDIT_INSERT, dict(zip(_AUDIT_COLUMNS, record, strict=True)))
 
 
 # RLS Filter Endpoints
@@ -224,7 +582,7 @@ async def log_audit(
 async def create_rls_filter(
     filter_data: RLSFilterCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_role(['ADMIN'])),
+    current_user: dict = Depends(require_admin),
     request: Request = None
 ):
     """
@@ -233,47 +591,32 @@ async def create_rls_filter(
     Only administrators can create RLS filters.
     """
     try:
-        # Serialize filter value
-        filter_value_json = serialize_filter_value(filter_data.filter_value)
-        
         # Insert filter
-        query = text("""
-            INSERT INTO user_rls_filters 
-            (user_id, connection_id, table_name, column_name, operator, filter_value, created_by)
-            VALUES (:user_id, :connection_id, :table_name, :column_name, :operator, :filter_value, :created_by)
-            ON CONFLICT (user_id, connection_id, table_name, column_name) 
-            DO UPDATE SET 
-                operator = EXCLUDED.operator,
-                filter_value = EXCLUDED.filter_value,
-                updated_at = CURRENT_TIMESTAMP,
-                is_active = TRUE
-            RETURNING id, user_id, connection_id, table_name, column_name, operator, filter_value, 
-                      is_active, created_at, updated_at, created_by
-        """)
-        
-        result = await db.execute(query, {
+        result = await db.execute(_Q_CREATE_FILTER, {
             'user_id': filter_data.user_id,
             'connection_id': filter_data.connection_id,
             'table_name': filter_data.table_name,
             'column_name': filter_data.column_name,
             'operator': filter_data.operator,
-            'filter_value': filter_value_json,
-            'created_by': current_user.id
+            'filter_value': filter_data.filter_value,
+            'created_by': _current_user_id(current_user)
         })
-        await db.commit()
         
         row = result.fetchone()
         if not row:
             raise HTTPException(status_code=500, detail="Failed to create RLS filter")
         
-        # Log audit
+        # Audit in the same transaction; one commit covers change and audit
         await log_audit(
             db, filter_data.user_id, filter_data.connection_id,
             'CREATE', 'RLS_FILTER', row[0],
             new_value=filter_data.dict(),
-            performed_by=current_user.id,
+            performed_by=_current_user_id(current_user),
             request=request
         )
+        await db.commit()
+        _config_cache.invalidate(row[1], row[2])
+        bump_rls_config_version()
         
         return RLSFilterResponse(
             id=row[0],
@@ -282,7 +625,7 @@ async def create_rls_filter(
             table_name=row[3],
             column_name=row[4],
             operator=row[5],
-            filter_value=deserialize_filter_value(row[6]),
+            filter_value=row[6],
             is_active=row[7],
             created_at=row[8],
             updated_at=row[9],
@@ -300,7 +643,7 @@ async def get_user_rls_filters(
     connection_id: int,
     include_inactive: bool = False,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user)
 ):
     """
     Get all RLS filters for a specific user and connection.
@@ -308,44 +651,13 @@ async def get_user_rls_filters(
     Users can view their own filters. Admins can view any user's filters.
     """
     # Check permission
-    if current_user.id != user_id and 'ADMIN' not in current_user.roles:
+    if _current_user_id(current_user) != user_id and current_user.get('role') != 'admin':
         raise HTTPException(status_code=403, detail="Not authorized to view this user's filters")
     
     try:
-        query_str = """
-            SELECT id, user_id, connection_id, table_name, column_name, operator, filter_value,
-                   is_active, created_at, updated_at, created_by
-            FROM user_rls_filters
-            WHERE user_id = :user_id AND connection_id = :connection_id
-        """
-        
-        if not include_inactive:
-            query_str += " AND is_active = TRUE"
-        
-        query_str += " ORDER BY table_name, column_name"
-        
-        result = await db.execute(text(query_str), {
-            'user_id': user_id,
-            'connection_id': connection_id
-        })
-        
-        filters = []
-        for row in result.fetchall():
-            filters.append(RLSFilterResponse(
-                id=row[0],
-                user_id=row[1],
-                connection_id=row[2],
-                table_name=row[3],
-                column_name=row[4],
-                operator=row[5],
-                filter_value=deserialize_filter_value(row[6]),
-                is_active=row[7],
-                created_at=row[8],
-                updated_at=row[9],
-                created_by=row[10]
-            ))
-        
-        return filters
+        rows = await _fetch_filters_rows(db, user_id, connection_id, include_inactive)
+        # Rows come from our own table with native types; skip re-validation
+        return [RLSFilterResponse.model_construct(**row) for row in rows]
     except Exception as e:
         logger.error(f"Error fetching RLS filters: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -356,7 +668,7 @@ async def update_rls_filter(
     filter_id: int,
     filter_data: RLSFilterUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_role(['ADMIN'])),
+    current_user: dict = Depends(require_admin),
     request: Request = None
 ):
     """
@@ -365,60 +677,45 @@ async def update_rls_filter(
     Only administrators can update RLS filters.
     """
     try:
-        # Get existing filter
-        existing = await db.execute(
-            text("SELECT * FROM user_rls_filters WHERE id = :id"),
-            {'id': filter_id}
-        )
-        existing_row = existing.fetchone()
-        if not existing_row:
-            raise HTTPException(status_code=404, detail="RLS filter not found")
-        
-        # Build update query
-        updates = []
-        params = {'id': filter_id}
-        
-        if filter_data.operator is not None:
-            updates.append("operator = :operator")
-            params['operator'] = filter_data.operator
-        
-        if filter_data.filter_value is not None:
-            updates.append("filter_value = :filter_value")
-            params['filter_value'] = serialize_filter_value(filter_data.filter_value)
-        
-        if filter_data.is_active is not None:
-            updates.append("is_active = :is_active")
-            params['is_active'] = filter_data.is_active
-        
-        if not updates:
+        if filter_data.operator is None and filter_data.filter_value is None and filter_data.is_active is None:
             raise HTTPException(status_code=400, detail="No fields to update")
         
-        updates.append("updated_at = CURRENT_TIMESTAMP")
-        
-        query = text(f"""
-            UPDATE user_rls_filters
-            SET {', '.join(updates)}
-            WHERE id = :id
-            RETURNING id, user_id, connection_id, table_name, column_name, operator, filter_value,
-                      is_active, created_at, updated_at, created_by
-        """)
-        
-        result = await db.execute(query, params)
-        await db.commit()
+        # Unsupplied fields bind as NULL and keep their current value
+        result = await db.execute(_Q_UPDATE_FILTER, {
+            'id': filter_id,
+            'operator': filter_data.operator,
+            'filter_value': filter_data.filter_value,
+            'is_active': filter_data.is_active
+        })
         
         row = result.fetchone()
         if not row:
-            raise HTTPException(status_code=500, detail="Failed to update RLS filter")
+            raise HTTPException(status_code=404, detail="RLS filter not found")
+        
+        # The merged operator and value must still render as SQL
+        try:
+            _build_filter_condition(row[4], row[5], row[6])
+        except ValueError as e:
+            await db.rollback()
+            raise HTTPException(status_code=422, detail=f"Invalid RLS filter: {e}")
         
-        # Log audit
+        # Audit in the same transaction; one commit covers change and audit
         await log_audit(
             db, row[1], row[2],
             'UPDATE', 'RLS_FILTER', filter_id,
-            old_value={'id': filter_id},
+            old_value={
+                'id': filter_id,
+                'operator': row[11],
+                'filter_value': row[12],
+                'is_active': row[13]
+            },
             new_value=filter_data.dict(exclude_none=True),
-            performed_by=current_user.id,
+            performed_by=_current_user_id(current_user),
             request=request
         )
+        await db.commit()
+        _config_cache.invalidate(row[1], row[2])
+        bump_rls_config_version()
         
         return RLSFilterResponse(
             id=row[0],
@@ -427,7 +724,7 @@ async def update_rls_filter(
             table_name=row[3],
             column_name=row[4],
             operator=row[5],
-            filter_value=deserialize_filter_value(row[6]),
+            filter_value=row[6],
             is_active=row[7],
             created_at=row[8],
             updated_at=row[9],
@@ -445,7 +742,7 @@ async def update_rls_filter(
 async def delete_rls_filter(
     filter_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_role(['ADMIN'])),
+    current_user: dict = Depends(require_admin),
     request: Request = None
 ):
     """
@@ -454,30 +751,26 @@ async def delete_rls_filter(
     Only administrators can delete RLS filters.
     """
     try:
-        # Get existing filter for audit log
-        existing = await db.execute(
-            text("SELECT user_id, connection_id FROM user_rls_filters WHERE id = :id"),
+        # Delete filter, returning the owner for the audit log
+        result = await db.execute(
+            _Q_DELETE_FILTER,
             {'id': filter_id}
         )
-        existing_row = existing.fetchone()
-        if not existing_row:
+        deleted_row = result.fetchone()
+        if not deleted_row:
             raise HTTPException(status_code=404, detail="RLS filter not found")
         
-        # Delete filter
-        await db.execute(
-            text("DELETE FROM user_rls_filters WHERE id = :id"),
-            {'id': filter_id}
-        )
-        await db.commit()
-        
-        # Log audit
+        # Audit in the same transaction; one commit covers change and audit
         await log_audit(
-            db, existing_row[0], existing_row[1],
+            db, deleted_row[0], deleted_row[1],
             'DELETE', 'RLS_FILTER', filter_id,
             old_value={'id': filter_id},
-            performed_by=current_user.id,
+            performed_by=_current_user_id(current_user),
             request=request
         )
+        await db.commit()
+        _config_cache.invalidate(deleted_row[0], deleted_row[1])
+        bump_rls_config_version()
         
         return None
     except HTTPException:
@@ -493,7 +786,7 @@ async def delete_rls_filter(
 async def assign_user_role(
     role_data: UserRoleCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_role(['ADMIN'])),
+    current_user: dict = Depends(require_admin),
     request: Request = None
 ):
     """
@@ -502,37 +795,28 @@ async def assign_user_role(
     Only administrators can assign roles.
     """
     try:
-        query = text("""
-            INSERT INTO user_connection_roles (user_id, connection_id, role, created_by)
-            VALUES (:user_id, :connection_id, :role, :created_by)
-            ON CONFLICT (user_id, connection_id)
-            DO UPDATE SET 
-                role = EXCLUDED.role,
-                updated_at = CURRENT_TIMESTAMP,
-                is_active = TRUE
-            RETURNING id, user_id, connection_id, role, is_active, created_at, updated_at, created_by
-        """)
-        
-        result = await db.execute(query, {
+        result = await db.execute(_Q_ASSIGN_ROLE, {
             'user_id': role_data.user_id,
             'connection_id': role_data.connection_id,
             'role': role_data.role,
-            'created_by': current_user.id
+            'created_by': _current_user_id(current_user)
         })
-        await db.commit()
         
         row = result.fetchone()
         if not row:
             raise HTTPException(status_code=500, detail="Failed to assign role")
         
-        # Log audit
+        # Audit in the same transaction; one commit covers change and audit
         await log_audit(
             db, role_data.user_id, role_data.connection_id,
             'CREATE', 'ROLE', row[0],
             new_value=role_data.dict(),
-            performed_by=current_user.id,
+            performed_by=_current_user_id(current_user),
             request=request
         )
+        await db.commit()
+        _config_cache.invalidate(row[1], row[2])
+        bump_rls_config_version()
         
         return UserRoleResponse(
             id=row[0],
@@ -555,44 +839,23 @@ async def get_user_roles(
     user_id: int,
     connection_id: Optional[int] = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user)
 ):
     """
     Get roles for a user across all connections or a specific connection.
     
     Users can view their own roles. Admins can view any user's roles.
     """
-    if current_user.id != user_id and 'ADMIN' not in current_user.roles:
+    if _current_user_id(current_user) != user_id and current_user.get('role') != 'admin':
         raise HTTPException(status_code=403, detail="Not authorized to view this user's roles")
     
     try:
-        query_str = """
-            SELECT id, user_id, connection_id, role, is_active, created_at, updated_at, created_by
-            FROM user_connection_roles
-            WHERE user_id = :user_id AND is_active = TRUE
-        """
-        params = {'user_id': user_id}
-        
-        if connection_id is not None:
-            query_str += " AND connection_id = :connection_id"
-            params['connection_id'] = connection_id
-        
-        result = await db.execute(text(query_str), params)
+        if connection_id is None:
+            rows = await _fetch_raw(db, _PG_GET_ROLES, user_id)
+        else:
+            rows = await _fetch_raw(db, _PG_GET_ROLES_FOR_CONNECTION, user_id, connection_id)
         
-        roles = []
-        for row in result.fetchall():
-            roles.append(UserRoleResponse(
-                id=row[0],
-                user_id=row[1],
-                connection_id=row[2],
-                role=row[3],
-                is_active=row[4],
-                created_at=row[5],
-                updated_at=row[6],
-                created_by=row[7]
-            ))
-        
-        return roles
+        return [UserRoleResponse.model_construct(**row) for row in rows]
     except Exception as e:
         logger.error(f"Error fetching user roles: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -604,78 +867,34 @@ async def get_user_rls_config(
     user_id: int,
     connection_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user)
 ):
     """
     Get complete RLS configuration for a user including role, filters, and permissions.
     
     This is the primary endpoint for loading user RLS configuration during query execution.
     """
-    if current_user.id != user_id and 'ADMIN' not in current_user.roles:
+    if _current_user_id(current_user) != user_id and current_user.get('role') != 'admin':
         raise HTTPException(status_code=403, detail="Not authorized to view this user's configuration")
     
+    key = (user_id, connection_id)
+    config = _config_cache.get(key)
+    if config is not None:
+        return config
+    
     try:
-        # Get user info
-        user_query = await db.execute(
-            text("SELECT username FROM users WHERE id = :user_id"),
-            {'user_id': user_id}
-        )
-        user_row = user_query.fetchone()
-        if not user_row:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        # Get role
-        role_query = await db.execute(
-            text("""
-                SELECT role FROM user_connection_roles 
-                WHERE user_id = :user_id AND connection_id = :connection_id AND is_active = TRUE
-            """),
-            {'user_id': user_id, 'connection_id': connection_id}
-        )
-        role_row = role_query.fetchone()
-        role = role_row[0] if role_row else None
-        
-        # Get filters
-        filters = await get_user_rls_filters(user_id, connection_id, False, db, current_user)
-        
-        # Get table permissions
-        perms_query = await db.execute(
-            text("""
-                SELECT id, user_id, connection_id, table_name, can_read, can_write, can_delete,
-                       allowed_columns, denied_columns, is_active, created_at, updated_at
-                FROM user_table_permissions
-                WHERE user_id = :user_id AND connection_id = :connection_id AND is_active = TRUE
-            """),
-            {'user_id': user_id, 'connection_id': connection_id}
-        )
-        
-        table_permissions = []
-        for row in perms_query.fetchall():
-            table_permissions.append(TablePermissionResponse(
-                id=row[0],
-                user_id=row[1],
-                connection_id=row[2],
-                table_name=row[3],
-                can_read=row[4],
-                can_write=row[5],
-                can_delete=row[6],
-                allowed_columns=json.loads(row[7]) if row[7] else None,
-                denied_columns=json.loads(row[8]) if row[8] else None,
-                is_active=row[9],
-                created_at=row[10],
-                updated_at=row[11]
-            ))
-        
-        return UserRLSConfigResponse(
-            user_id=user_id,
-            username=user_row[0],
-            connection_id=connection_id,
-            role=role,
-            rls_filters=filters,
-            table_permissions=table_permissions
-        )
+        # Only one request per key loads from the database; the rest wait for it
+        async with _config_cache.lock(key):
+            config = _config_cache.get(key)
+            if config is None:
+                config = await _load_user_rls_config(db, user_id, connection_id)
+                _config_cache.set(key, config)
+        return config
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error fetching RLS configuration: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Don't keep the lock of a key whose load failed
+        _config_cache._release_lock(key)
@@ -5,21 +5,127 @@ Automatically injects security filters into SQL queries based on user permission
 Implements ThoughtSpot-style query rewriting for data security.
 """
 
-import sqlparse
+import os
+import queue
+import re
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 from sqlparse import sql, tokens as T
-from typing import List, Dict, Any, Optional, Set, Tuple
-from pydantic import BaseModel, Field
+from sqlparse.engine import FilterStack
+from sqlparse.sql import Where
+from typing import List, Dict, Any, FrozenSet, Iterable, Optional, Set, Tuple
 
 from src.user.authorization import UserContext, RLSFilter
 
 
-class RLSInjectionResult(BaseModel):
-    """Result of RLS filter injection."""
-    original_sql: str = Field(description="Original SQL query")
-    rewritten_sql: str = Field(description="SQL with RLS filters injected")
-    injected_filters: List[Dict[str, str]] = Field(description="Filters that were injected")
-    tables_affected: List[str] = Field(description="Tables that had filters applied")
-    bypass_detected: bool = Field(default=False, description="Whether bypass attempt was detected")
+# Clause keywords that end a WHERE clause / mark where one must be inserted
+_END_KW_RE = re.compile(r'\b(GROUP\s+BY|ORDER\s+BY|LIMIT|HAVING|UNION)\b', re.IGNORECASE)
+
+# Table references for flat queries: FROM/JOIN name, then any ", name" list items
+_FROM_JOIN_RE = re.compile(r'\b(?:FROM|JOIN)\s+([A-Za-z_][\w.]*)', re.IGNORECASE)
+_FROM_LIST_NEXT_RE = re.compile(r'(?:\s+(?:AS\s+)?[A-Za-z_]\w*)?\s*,\s*([A-Za-z_][\w.]*)', re.IGNORECASE)
+
+# Single-table SELECT with at most a trailing LIMIT/OFFSET; the WHERE goes between them
+_SIMPLE_SELECT_RE = re.compile(
+    r'^(\s*SELECT\b.*?\bFROM\s+[A-Za-z_][\w.]*)'
+    r'(\s+(?:LIMIT|OFFSET)\s+\d+(?:\s+OFFSET\s+\d+)?)?\s*;?\s*$',
+    re.IGNORECASE | re.DOTALL
+)
+_CLAUSE_KW_RE = re.compile(r'\b(?:WHERE|GROUP|ORDER|HAVING|UNION|JOIN)\b', re.IGNORECASE)
+
+# Subqueries, CTEs and quoted identifiers need the full AST walk. So do comments,
+# ONLY / LATERAL and a FROM/JOIN not directly followed by a plain name: the
+# fast regex would miss the table there, and missing one means no filter.
+_NEEDS_AST_RE = re.compile(
+    r'\(\s*SELECT\b|\bWITH\b|"|--|/\*|\b(?:ONLY|LATERAL)\b'
+    r'|\b(?:FROM|JOIN)\b(?!\s+[A-Za-z_])',
+    re.IGNORECASE
+)
+
+
+def _ends_with_line_comment(tokens: Iterable[sql.Token]) -> bool:
+    """Whether the last non-whitespace leaf of tokens is a -- comment."""
+    last = None
+    for token in tokens:
+        for leaf in token.flatten():
+            if not leaf.is_whitespace:
+                last = leaf
+    return last is not None and last.ttype in T.Comment.Single
+
+
+def _close_line_comment(text: str, tokens: Iterable[sql.Token]) -> str:
+    """Terminate a trailing -- comment so text appended after it stays code."""
+    if _ends_with_line_comment(tokens):
+        return text + '\n'
+    return text
+
+
+@lru_cache(maxsize=1024)
+def _extract_tables_fast(sql_lower: str) -> FrozenSet[str]:
+    """Extract table names from a flat (no subquery/CTE), already lower-cased query."""
+    tables = set()
+    for match in _FROM_JOIN_RE.finditer(sql_lower):
+        tables.add(sys.intern(match.group(1).rsplit('.', 1)[-1]))
+        
+        # Comma-separated FROM list: FROM a x, b y
+        pos = match.end()
+        while True:
+            item = _FROM_LIST_NEXT_RE.match(sql_lower, pos)
+            if item is None:
+                break
+            tables.add(sys.intern(item.group(1).rsplit('.', 1)[-1]))
+            pos = item.end()
+    return frozenset(tables)
+
+
+# Shared grouping filter stack. sqlparse.parse builds a new one per call (its
+# lexer is already a process-wide singleton) and groups every statement in the
+# input; run() is lazy, so taking only the first statement groups only that one.
+_PARSE_STACK = FilterStack()
+_PARSE_STACK.enable_grouping()
+
+
+@lru_cache(maxsize=1024)
+def _parse_cached(sql_text: str) -> sql.Statement:
+    """
+    Parse SQL once per distinct query text.
+    
+    The engine only reads the returned statement's tokens, so sharing it
+    between calls is safe. Bounded to keep high-cardinality SQL from growing
+    the cache without limit.
+    """
+    statement = next(_PARSE_STACK.run(sql_text), None)
+    if statement is None:
+        raise ValueError("Failed to parse SQL")
+    return statement
+
+
+@dataclass(slots=True, frozen=True)
+class RLSInjectionResult:
+    """
+    Result of RLS filter injection.
+    
+    Built only from engine-internal values, so it skips model validation.
+    """
+    original_sql: str  # Original SQL query
+    rewritten_sql: str  # SQL with RLS filters injected
+    injected_filters: List[Dict[str, str]]  # Filters that were injected
+    tables_affected: List[str]  # Tables that had filters applied
+    bypass_detected: bool = False  # Whether bypass attempt was detected
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a plain dict for serialization."""
+        return {
+            "original_sql": self.original_sql,
+            "rewritten_sql": self.rewritten_sql,
+            "injected_filters": self.injected_filters,
+            "tables_affected": self.tables_affected,
+            "bypass_detected": self.bypass_detected
+        }
 
 
 class RLSEngine:
@@ -34,15 +140,21 @@ class RLSEngine:
     - Audit logging
     """
     
-    def __init__(self, enable_audit: bool = True):
+    def __init__(self, enable_audit: bool = True, audit_max: int = 10_000):
         """
         Initialize RLS engine.
         
         Args:
             enable_audit: Enable audit logging of RLS operations
+            audit_max: Most recent audit entries to keep (older ones are dropped)
         """
         self.enable_audit = enable_audit
-        self._audit_log: List[Dict[str, Any]] = []
+        self._audit_log: deque = deque(maxlen=audit_max)
+        
+        # Entries are queued as tuples and turned into dicts off the request path
+        self._audit_q: queue.SimpleQueue = queue.SimpleQueue()
+        self._audit_thread: Optional[threading.Thread] = None
+        self._audit_thread_lock = threading.Lock()
     
     def inject_rls(
         self,
@@ -68,23 +180,33 @@ class RLSEngine:
                 tables_affected=[]
             )
         
-        # Parse SQL
+        # Lower-cased once, shared by the pre-check and fast table extraction
+        sql_lower = sql.lower()
+        
+        # Substring pre-check: no governed table named anywhere means nothing to inject
+        if not user_context.mentions_rls_table(sql_lower):
+            # Query touches no governed table
+            return RLSInjectionResult(
+                original_sql=sql,
+                rewritten_sql=sql,
+                injected_filters=[],
+                tables_affected=[]
+            )
+        
+        # Extract tables from query; flat queries skip the AST walk
+        needs_ast = _NEEDS_AST_RE.search(sql) is not None
         try:
-            parsed = sqlparse.parse(sql)
-            if not parsed:
-                raise ValueError("Failed to parse SQL")
-            
-            statement = parsed[0]
+            if needs_ast:
+                tables_in_query = self._extract_tables(_parse_cached(sql))
+            else:
+                tables_in_query = _extract_tables_fast(sql_lower)
         except Exception as e:
             raise ValueError(f"SQL parsing error: {str(e)}")
         
-        # Extract tables from query
-        tables_in_query = self._extract_tables(statement)
-        
         # Find applicable RLS filters
         applicable_filters = self._find_applicable_filters(
             tables_in_query,
-            user_context.rls_filters
+            user_context.filters_by_table_lc
         )
         
         if not applicable_filters:
@@ -96,12 +218,26 @@ class RLSEngine:
                 tables_affected=[]
             )
         
-        # Inject filters into SQL
-        rewritten_sql = self._inject_filters_into_sql(
-            sql,
-            statement,
-            applicable_filters
-        )
+        affected_tables = tuple(dict.fromkeys(f.table_name for f in applicable_filters))
+        
+        # SELECT ... FROM t [LIMIT n] needs no parse: splice in the context's
+        # prebuilt " WHERE ..." clause
+        simple_match = None
+        if not needs_ast and _CLAUSE_KW_RE.search(sql) is None:
+            simple_match = _SIMPLE_SELECT_RE.match(sql)
+        
+        if simple_match is not None:
+            head, tail = simple_match.group(1, 2)
+            rewritten_sql = head.strip() + user_context.rls_where_clause(affected_tables)
+            if tail:
+                rewritten_sql += tail
+        else:
+            # Inject the pre-joined "(c1) AND (c2)", memoized on the context
+            rewritten_sql = self._inject_filters_into_sql(
+                sql,
+                _parse_cached(sql),
+                user_context.rls_where_fragment(affected_tables)
+            )
         
         # Build result
         result = RLSInjectionResult(
@@ -120,61 +256,132 @@ class RLSEngine:
         
         # Audit log
         if self.enable_audit:
+            self._queue_audit(user_context.user_id, result)
+        
+        return result
+    
+    def inject_rls_batch(
+        self,
+        queries: List[Tuple[str, UserContext]],
+        workers: Optional[int] = None
+    ) -> List[RLSInjectionResult]:
+        """
+        Inject RLS filters into many queries using a process pool.
+        
+        Meant for bulk back-office rewrites; request handling should keep
+        calling inject_rls directly.
+        
+        Args:
+            queries: (sql, user_context) pairs
+            workers: Worker processes (defaults to the CPU count)
+        
+        Returns:
+            One RLSInjectionResult per query, in input order
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(queries) < 2:
+            return [self.inject_rls(sql, user_context) for sql, user_context in queries]
+        
+        chunksize = max(1, len(queries) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker) as pool:
+            results = list(pool.map(_inject_rls_in_worker, queries, chunksize=chunksize))
+        
+        # Workers don't audit; record here what inject_rls would have
+        if self.enable_audit:
+            for (_, user_context), result in zip(queries, results, strict=True):
+                if result.injected_filters:
+                    self._queue_audit(user_context.user_id, result)
+        
+        return results
+    
+    def _queue_audit(self, user_id: str, result: RLSInjectionResult):
+        """Hand an injection off to the audit thread."""
+        if self._audit_thread is None:
+            self._start_audit_thread()
+        self._audit_q.put_nowait((
+            user_id,
+            result.original_sql,
+            result.rewritten_sql,
+            len(result.injected_filters),
+            result.tables_affected
+        ))
+    
+    def _start_audit_thread(self):
+        """Start the daemon thread that drains queued audit entries."""
+        with self._audit_thread_lock:
+            if self._audit_thread is None:
+                thread = threading.Thread(
+                    target=self._drain_audit_queue,
+                    name="rls-audit",
+                    daemon=True
+                )
+                thread.start()
+                self._audit_thread = thread
+    
+    def _drain_audit_queue(self):
+        """Consume queued audit entries into the bounded audit log."""
+        while True:
+            item = self._audit_q.get()
+            if isinstance(item, threading.Event):
+                # Flush marker: everything queued before it has been logged
+                item.set()
+                continue
+            
+            user_id, original_sql, rewritten_sql, filters_applied, tables_affected = item
             self._audit_log.append({
-                "user_id": user_context.user_id,
-                "original_sql": sql,
+                "user_id": user_id,
+                "original_sql": original_sql,
                 "rewritten_sql": rewritten_sql,
-                "filters_applied": len(applicable_filters),
-                "tables_affected": result.tables_affected
+                "filters_applied": filters_applied,
+                "tables_affected": tables_affected
             })
-        
-        return result
     
-    def _extract_tables(self, statement: sql.Statement) -> Set[str]:
+    def _flush_audit_queue(self, timeout: float = 5.0):
+        """Wait until entries queued so far have reached the audit log."""
+        if self._audit_thread is None:
+            return
+        done = threading.Event()
+        self._audit_q.put_nowait(done)
+        done.wait(timeout)
+    
+    def _extract_tables(self, statement: sql.TokenList) -> Set[str]:
         """Extract all table names from SQL statement."""
         tables = set()
         
-        # Look for FROM and JOIN clauses
-        from_seen = False
-        join_seen = False
+        # 0 = idle, 1 = the next identifier names a table (after FROM / JOIN)
+        state = 0
         
         for token in statement.tokens:
-            # FROM keyword
-            if token.ttype is T.Keyword and token.value.upper() == 'FROM':
-                from_seen = True
-                continue
+            ttype = token.ttype
             
-            # JOIN keyword
-            if token.ttype is T.Keyword and 'JOIN' in token.value.upper():
-                join_seen = True
+            if ttype is T.Keyword:
+                keyword = token.normalized
+                if state == 1 and keyword in ('ONLY', 'LATERAL'):
+                    # FROM ONLY t / JOIN LATERAL t: the table still follows
+                    continue
+                state = 1 if keyword == 'FROM' or 'JOIN' in keyword else 0
                 continue
             
-            # Identifier after FROM or JOIN
-            if (from_seen or join_seen) and isinstance(token, sql.Identifier):
-                table_name = token.get_real_name()
-                if table_name:
-                    tables.add(table_name.lower())
-                from_seen = False
-                join_seen = False
-            
-            # Simple name token
-            elif (from_seen or join_seen) and token.ttype is T.Name:
-                tables.add(token.value.lower())
-                from_seen = False
-                join_seen = False
-            
-            # Recurse into subqueries
-            if isinstance(token, sql.Parenthesis):
-                try:
-                    inner_sql = token.value.strip('()')
-                    inner_parsed = sqlparse.parse(inner_sql)
-                    if inner_parsed:
-                        tables.update(self._extract_tables(inner_parsed[0]))
-                except:
-                    pass
+            if state == 1:
+                if isinstance(token, sql.Identifier):
+                    table_name = token.get_real_name()
+                    if table_name:
+                        tables.add(sys.intern(table_name.lower()))
+                    state = 0
+                elif isinstance(token, sql.IdentifierList):
+                    # FROM a x, b y
+                    for item in token.get_identifiers():
+                        if isinstance(item, sql.Identifier):
+                            table_name = item.get_real_name()
+                            if table_name:
+                                tables.add(sys.intern(table_name.lower()))
+                    state = 0
+                elif ttype is T.Name:
+                    tables.add(sys.intern(token.value.lower()))
+                    state = 0
             
-            # Recurse into other structures
-            if hasattr(token, 'tokens'):
+            # Recurse into subqueries and other groups
+            if isinstance(token, sql.TokenList):
                 tables.update(self._extract_tables(token))
         
         return tables
@@ -182,14 +389,16 @@ class RLSEngine:
     def _find_applicable_filters(
         self,
         tables_in_query: Set[str],
-        rls_filters: List[RLSFilter]
+        filters_by_table: Dict[str, Tuple[RLSFilter, ...]]
     ) -> List[RLSFilter]:
         """Find RLS filters that apply to tables in query."""
-        applicable = []
+        applicable: List[RLSFilter] = []
         
-        for rls_filter in rls_filters:
-            if rls_filter.table_name.lower() in tables_in_query:
-                applicable.append(rls_filter)
+        # Sorted so the rewritten SQL is identical across processes (str hashes are salted)
+        for table in sorted(tables_in_query):
+            filters = filters_by_table.get(table)
+            if filters:
+                applicable.extend(filters)
         
         return applicable
     
@@ -197,7 +406,7 @@ class RLSEngine:
         self,
         sql: str,
         statement: sql.Statement,
-        filters: List[RLSFilter]
+        rls_filter_str: str
     ) -> str:
         """
         Inject RLS filters into SQL WHERE clause.
@@ -207,146 +416,96 @@ class RLSEngine:
         2. If no WHERE clause, add one with RLS filters
         3. Handle multiple tables with appropriate filters
         """
-        # Group filters by table
-        filters_by_table = {}
-        for f in filters:
-            filters_by_table[f.table_name.lower()] = f.filter_condition
-        
-        # Find WHERE clause position
-        where_idx = None
-        for idx, token in enumerate(statement.tokens):
-            if token.ttype is T.Keyword and token.value.upper() == 'WHERE':
-                where_idx = idx
-                break
+        # Top-level tokens concatenate back to the SQL text, so summing their
+        # lengths gives character offsets without re-stringifying the tree
+        offset = 0
+        for token in statement.tokens:
+            if isinstance(token, Where):
+                # WHERE clause exists - inject filters
+                return self._inject_into_existing_where(sql, offset, token, rls_filter_str)
+            offset += len(token.value)
         
-        if where_idx is not None:
-            # WHERE clause exists - inject filters
-            return self._inject_into_existing_where(sql, filters_by_table)
-        else:
-            # No WHERE clause - add one
-            return self._add_where_with_filters(sql, filters_by_table)
+        # No WHERE clause - add one
+        return self._add_where_with_filters(sql, statement, rls_filter_str)
     
     def _inject_into_existing_where(
         self,
         sql: str,
-        filters_by_table: Dict[str, str]
+        where_offset: int,
+        where: Where,
+        rls_filter_str: str
     ) -> str:
         """Inject RLS filters into existing WHERE clause."""
-        # Simple approach: wrap existing WHERE in parentheses and AND our filters
-        
-        # Find WHERE clause
-        where_match = sqlparse.parse(sql)[0]
-        where_start = None
-        where_end = None
-        
-        tokens = where_match.tokens
-        for idx, token in enumerate(tokens):
-            if token.ttype is T.Keyword and token.value.upper() == 'WHERE':
-                where_start = idx
-                # Find the end of WHERE clause (next keyword like GROUP BY, ORDER BY, LIMIT)
-                for end_idx in range(idx + 1, len(tokens)):
-                    end_token = tokens[end_idx]
-                    if end_token.ttype is T.Keyword and end_token.value.upper() in (
-                        'GROUP', 'ORDER', 'LIMIT', 'HAVING', 'UNION'
-                    ):
-                        where_end = end_idx
-                        break
-                if where_end is None:
-                    where_end = len(tokens)
-                break
-        
-        if where_start is None:
-            # Fallback: simple string injection
-            return self._simple_string_injection(sql, filters_by_table)
-        
-        # Extract WHERE condition
-        where_condition_tokens = tokens[where_start + 1:where_end]
-        where_condition = ''.join(str(t) for t in where_condition_tokens).strip()
+        # Simple approach: wrap existing WHERE in parentheses and AND our filters;
+        # a trailing -- comment must not swallow the closing parenthesis
+        where_text = where.value
+        where_condition = _close_line_comment(where_text[len('WHERE'):].strip(), [where])
         
-        # Build RLS filter string
-        rls_conditions = [f"({condition})" for condition in filters_by_table.values()]
-        rls_filter_str = " AND ".join(rls_conditions)
-        
-        # Rebuild SQL
-        before_where = ''.join(str(t) for t in tokens[:where_start])
-        after_where = ''.join(str(t) for t in tokens[where_end:])
+        # Rebuild SQL by slicing around the WHERE clause
+        before_where = sql[:where_offset]
+        after_where = sql[where_offset + len(where_text):].strip()
         
         new_where = f"WHERE ({where_condition}) AND {rls_filter_str}"
         
-        return f"{before_where} {new_where} {after_where}"
+        if after_where:
+            return f"{before_where}{new_where} {after_where}"
+        return f"{before_where}{new_where}"
     
     def _add_where_with_filters(
         self,
         sql: str,
-        filters_by_table: Dict[str, str]
+        statement: sql.Statement,
+        rls_filter_str: str
     ) -> str:
         """Add WHERE clause with RLS filters to query without WHERE."""
-        # Build RLS filter string
-        rls_conditions = [f"({condition})" for condition in filters_by_table.values()]
-        rls_filter_str = " AND ".join(rls_conditions)
-        
-        # Find position to insert WHERE
-        # Look for GROUP BY, ORDER BY, LIMIT, or end of query
-        parsed = sqlparse.parse(sql)[0]
-        insert_before_keywords = ['GROUP', 'ORDER', 'LIMIT', 'HAVING', 'UNION']
-        
-        insert_position = None
-        for idx, token in enumerate(parsed.tokens):
-            if token.ttype is T.Keyword and token.value.upper() in insert_before_keywords:
-                # Insert before this keyword
-                before_tokens = parsed.tokens[:idx]
-                after_tokens = parsed.tokens[idx:]
-                
-                before_sql = ''.join(str(t) for t in before_tokens).strip()
-                after_sql = ''.join(str(t) for t in after_tokens).strip()
-                
+        # Insert before the first top-level GROUP BY / ORDER BY / LIMIT / HAVING / UNION.
+        # Only keyword tokens count, so words inside literals and comments never split the query.
+        tokens = statement.tokens
+        offset = 0
+        for index, token in enumerate(tokens):
+            if token.ttype in T.Keyword and _END_KW_RE.match(token.normalized):
+                before_sql = _close_line_comment(sql[:offset].strip(), tokens[:index])
+                after_sql = sql[offset:].strip()
                 return f"{before_sql} WHERE {rls_filter_str} {after_sql}"
+            offset += len(token.value)
         
         # No keywords found - insert at end (before semicolon if exists)
-        sql_stripped = sql.rstrip(';').strip()
+        end = len(tokens)
+        while end and (tokens[end - 1].is_whitespace or tokens[end - 1].match(T.Punctuation, ';')):
+            end -= 1
+        body = tokens[:end]
+        sql_stripped = _close_line_comment(''.join(t.value for t in body).strip(), body)
         return f"{sql_stripped} WHERE {rls_filter_str}"
     
-    def _simple_string_injection(
-        self,
-        sql: str,
-        filters_by_table: Dict[str, str]
-    ) -> str:
-        """Simple string-based injection (fallback)."""
-        rls_conditions = [f"({condition})" for condition in filters_by_table.values()]
-        rls_filter_str = " AND ".join(rls_conditions)
-        
-        # Find WHERE keyword
-        sql_upper = sql.upper()
-        where_pos = sql_upper.find('WHERE')
-        
-        if where_pos != -1:
-            # Find end of WHERE clause
-            end_keywords = ['GROUP BY', 'ORDER BY', 'LIMIT', 'HAVING']
-            end_pos = len(sql)
-            for keyword in end_keywords:
-                kw_pos = sql_upper.find(keyword, where_pos)
-                if kw_pos != -1:
-                    end_pos = min(end_pos, kw_pos)
-            
-            # Extract parts
-            before = sql[:where_pos + 5]  # Including 'WHERE'
-            condition = sql[where_pos + 5:end_pos].strip()
-            after = sql[end_pos:]
-            
-            return f"{before} ({condition}) AND {rls_filter_str} {after}"
-        else:
-            # No WHERE - add one
-            return self._add_where_with_filters(sql, filters_by_table)
-    
     def get_audit_log(self) -> List[Dict[str, Any]]:
         """Get RLS audit log."""
-        return self._audit_log.copy()
+        self._flush_audit_queue()
+        return list(self._audit_log)
     
     def clear_audit_log(self):
         """Clear audit log."""
+        self._flush_audit_queue()
         self._audit_log.clear()
 
 
+# Per-process engine for inject_rls_batch workers
+_batch_engine: Optional[RLSEngine] = None
+
+
+def _init_batch_worker():
+    """Create the worker's engine and start from empty parse caches."""
+    global _batch_engine
+    _batch_engine = RLSEngine(enable_audit=False)
+    _parse_cached.cache_clear()
+    _extract_tables_fast.cache_clear()
+
+
+def _inject_rls_in_worker(item: Tuple[str, UserContext]) -> RLSInjectionResult:
+    """Run inject_rls for one (sql, user_context) pair inside a pool worker."""
+    sql_text, user_context = item
+    return _batch_engine.inject_rls(sql_text, user_context)
+
+
 # Example usage and testing
 if __name__ == "__main__":
     from src.user.authorization import UserContext, Role, RLSFilter, TablePermission
@@ -4,18 +4,121 @@ RLS Configuration Loader
 Loads user RLS configuration from database and creates UserContext for query execution.
 """
 
-from typing import Optional, List
+from collections import OrderedDict
+from typing import Any, Literal, Optional, List, Tuple, get_args
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 import json
 import logging
+import math
+import re
+import time
 
 from src.user.authorization import (
-    UserContext, Role, Permission, TablePermission, RLSFilter
+    UserContext, Role, TablePermission, RLSFilter
 )
 
 logger = logging.getLogger(__name__)
 
+# Operators accepted for stored filters (mirror the user_rls_filters CHECK constraint)
+FilterOperator = Literal['=', '!=', '>', '<', '>=', '<=', 'IN', 'NOT IN', 'LIKE', 'NOT LIKE', 'IS NULL', 'IS NOT NULL']
+_FILTER_OPERATORS = frozenset(get_args(FilterOperator))
+
+# Column names that are safe to emit unquoted
+_PLAIN_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# User, role, filters and table permissions in a single query. Columns:
+# src, c1-c4 (text), v (jsonb filter value), b (can_read)
+_LOAD_CONTEXT_QUERY = text("""
+    SELECT 'user' AS src, username AS c1, email AS c2, NULL AS c3, NULL AS c4,
+           NULL::jsonb AS v, NULL::boolean AS b
+    FROM users WHERE id = :user_id
+    UNION ALL
+    SELECT 'role', role, NULL, NULL, NULL, NULL, NULL
+    FROM user_connection_roles
+    WHERE user_id = :user_id AND connection_id = :connection_id AND is_active = TRUE
+    UNION ALL
+    SELECT 'filter', table_name, column_name, operator, NULL, filter_value, NULL
+    FROM user_rls_filters
+    WHERE user_id = :user_id AND connection_id = :connection_id AND is_active = TRUE
+    UNION ALL
+    SELECT 'perm', table_name, allowed_columns, denied_columns, NULL, NULL, can_read
+    FROM user_table_permissions
+    WHERE user_id = :user_id AND connection_id = :connection_id AND is_active = TRUE
+""")
+
+# Loaded contexts keyed by (user_id, connection_id). Entries carry the config
+# version they were built under; any RLS configuration change bumps the version.
+_CONTEXT_CACHE_TTL_SECONDS = 60
+_CONTEXT_CACHE_MAX_ENTRIES = 4096
+_context_cache: "OrderedDict[Tuple[int, int], Tuple[float, int, UserContext]]" = OrderedDict()
+_config_version = 0
+
+
+def bump_rls_config_version():
+    """Invalidate all cached contexts after an RLS filter, role, or permission change."""
+    global _config_version
+    _config_version += 1
+
+
+def _get_cached_context(key: Tuple[int, int]) -> Optional[UserContext]:
+    """Return a cached context if it is fresh and built under the current version."""
+    entry = _context_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, version, user_context = entry
+    if version != _config_version or time.monotonic() >= expires_at:
+        del _context_cache[key]
+        return None
+    return user_context
+
+
+def _cache_context(key: Tuple[int, int], user_context: UserContext):
+    """Cache a loaded context, evicting the oldest entries beyond the size cap."""
+    _context_cache[key] = (time.monotonic() + _CONTEXT_CACHE_TTL_SECONDS, _config_version, user_context)
+    _context_cache.move_to_end(key)
+    while len(_context_cache) > _CONTEXT_CACHE_MAX_ENTRIES:
+        _context_cache.popitem(last=False)
+
+
+def _sql_literal(value: Any) -> str:
+    """Render a scalar filter value as a SQL literal."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ValueError(f"Non-finite filter value: {value}")
+        return str(value)
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    raise ValueError(f"Unsupported filter value type: {type(value).__name__}")
+
+
+def _sql_identifier(name: str) -> str:
+    """Render a stored column name, quoting anything that is not a plain identifier."""
+    if _PLAIN_IDENTIFIER_RE.match(name):
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _build_filter_condition(column: str, operator: str, value: Any) -> str:
+    """Build the SQL condition for a stored (column, operator, value) filter."""
+    if operator not in _FILTER_OPERATORS:
+        raise ValueError(f"Unsupported filter operator: {operator!r}")
+    column = _sql_identifier(column)
+    if operator in ('IS NULL', 'IS NOT NULL'):
+        return f"{column} {operator}"
+    if operator in ('IN', 'NOT IN'):
+        values = value if isinstance(value, list) else [value]
+        if not values:
+            raise ValueError(f"{operator} needs at least one value")
+        return f"{column} {operator} ({', '.join(_sql_literal(v) for v in values)})"
+    return f"{column} {operator} {_sql_literal(value)}"
+
 
 async def load_user_rls_context(
     db: AsyncSession,
@@ -33,29 +136,44 @@ async def load_user_rls_context(
     Returns:
         UserContext with configured permissions and RLS filters
     """
+    key = (user_id, connection_id)
+    cached = _get_cached_context(key)
+    if cached is not None:
+        return cached
+    
+    # Version at load start; a change during the load leaves this entry stale
+    version = _config_version
+    
     try:
-        # Get user info
-        user_query = await db.execute(
-            text("SELECT username, email FROM users WHERE id = :user_id"),
-            {'user_id': user_id}
+        # One round-trip; rows are tagged by source and dispatched below
+        result = await db.execute(
+            _LOAD_CONTEXT_QUERY,
+            {'user_id': user_id, 'connection_id': connection_id}
         )
-        user_row = user_query.fetchone()
+        
+        user_row = None
+        role_str = None
+        filter_rows = []
+        perm_rows = []
+        for row in result.fetchall():
+            source = row[0]
+            if source == 'filter':
+                filter_rows.append(row)
+            elif source == 'perm':
+                perm_rows.append(row)
+            elif source == 'user':
+                user_row = row
+            elif source == 'role':
+                role_str = row[1]
+        
         if not user_row:
             raise ValueError(f"User {user_id} not found")
         
-        username = user_row[0]
-        email = user_row[1]
+        username = user_row[1]
+        email = user_row[2]
         
-        # Get user role for this connection
-        role_query = await db.execute(
-            text("""
-                SELECT role FROM user_connection_roles
-                WHERE user_id = :user_id AND connection_id = :connection_id AND is_active = TRUE
-            """),
-            {'user_id': user_id, 'connection_id': connection_id}
-        )
-        role_row = role_query.fetchone()
-        role_str = role_row[0] if role_row else 'VIEWER'
+        # Role for this connection
+        role_str = role_str or 'VIEWER'
         
         # Map string role to Role enum
         try:
@@ -64,50 +182,42 @@ async def load_user_rls_context(
             logger.warning(f"Unknown role '{role_str}', defaulting to VIEWER")
             role = Role.VIEWER
         
-        # Get RLS filters
-        filters_query = await db.execute(
-            text("""
-                SELECT table_name, column_name, operator, filter_value
-                FROM user_rls_filters
-                WHERE user_id = :user_id AND connection_id = :connection_id AND is_active = TRUE
-            """),
-            {'user_id': user_id, 'connection_id': connection_id}
-        )
-        
+        # RLS filters: (src, table_name, column_name, operator, -, filter_value, -)
         rls_filters = []
-        for row in filters_query.fetchall():
+        denied_tables = []
+        for row in filter_rows:
             try:
-                # Deserialize filter value
-                filter_value = json.loads(row[3]) if row[3] else None
+                # JSONB column, already decoded by the driver
+                filter_value = row[5]
                 
                 rls_filters.append(RLSFilter(
-                    table=row[0],
-                    column=row[1],
-                    operator=row[2],
-                    value=filter_value
+                    table_name=row[1],
+                    filter_condition=_build_filter_condition(row[2], row[3], filter_value)
                 ))
             except Exception as e:
-                logger.error(f"Failed to parse RLS filter: {e}")
-                continue
-        
-        # Get table permissions
-        perms_query = await db.execute(
-            text("""
-                SELECT table_name, can_read, can_write, can_delete, allowed_columns, denied_columns
-                FROM user_table_permissions
-                WHERE user_id = :user_id AND connection_id = :connection_id AND is_active = TRUE
-            """),
-            {'user_id': user_id, 'connection_id': connection_id}
-        )
+                # Fail closed: a filter that cannot be rendered must not leave
+                # the table unfiltered, so the table matches no rows and is denied
+                logger.error(f"Invalid RLS filter on {row[1]}, denying the table: {e}")
+                rls_filters.append(RLSFilter(
+                    table_name=row[1],
+                    filter_condition="FALSE",
+                    description="Stored RLS filter is invalid; access denied"
+                ))
+                denied_tables.append(row[1])
         
-        table_permissions = []
-        for row in perms_query.fetchall():
+        # Table permissions: (src, table_name, allowed_columns, denied_columns, -, -, can_read)
+        table_permissions = [TablePermission(table_name=table) for table in dict.fromkeys(denied_tables)]
+        for row in perm_rows:
+            if row[1] in denied_tables:
+                continue
             try:
-                allowed_cols = json.loads(row[4]) if row[4] else None
-                denied_cols = json.loads(row[5]) if row[5] else None
+                allowed_cols = json.loads(row[2]) if row[2] else None
+                denied_cols = json.loads(row[3]) if row[3] else None
                 
                 table_permissions.append(TablePermission(
-                    table=row[0],
+                    table_name=row[1],
+                    can_query=row[6],
+                    can_view=row[6],
                     allowed_columns=allowed_cols,
                     denied_columns=denied_cols
                 ))
@@ -115,45 +225,29 @@ async def load_user_rls_context(
                 logger.error(f"Failed to parse table permission: {e}")
                 continue
         
-        # Determine permissions based on role
-        permissions = []
-        if role in [Role.ADMIN, Role.ANALYST]:
-            permissions = [
-                Permission.QUERY_DATA,
-                Permission.VIEW_METRICS,
-                Permission.VIEW_INSIGHTS
-            ]
-        elif role == Role.VIEWER:
-            permissions = [
-                Permission.QUERY_DATA,
-                Permission.VIEW_METRICS
-            ]
-        else:  # EXTERNAL
-            permissions = [Permission.QUERY_DATA]
-        
         # Create UserContext
         user_context = UserContext(
             user_id=str(user_id),
             username=username,
             email=email,
             roles=[role],
-            permissions=permissions,
-            table_permissions=table_permissions if table_permissions else None,
-            rls_filters=rls_filters if rls_filters else None
+            table_permissions=table_permissions,
+            rls_filters=rls_filters
         )
         
         logger.info(f"Loaded RLS context for user {username}: role={role_str}, filters={len(rls_filters)}, permissions={len(table_permissions)}")
         
+        if version == _config_version:
+            _cache_context(key, user_context)
         return user_context
         
     except Exception as e:
         logger.error(f"Failed to load user RLS context: {e}")
-        # Return minimal context with VIEWER role
+        # Return minimal context with VIEWER role (not cached)
         return UserContext(
             user_id=str(user_id),
             username="unknown",
-            roles=[Role.VIEWER],
-            permissions=[Permission.QUERY_DATA]
+            roles=[Role.VIEWER]
         )
 
 
@@ -199,17 +293,16 @@ def get_rls_summary(user_context: UserContext) -> dict:
         'rls_filters_count': len(user_context.rls_filters) if user_context.rls_filters else 0,
         'rls_filters': [
             {
-                'table': f.table,
-                'column': f.column,
-                'operator': f.operator,
-                'value': f.value
+                'table': f.table_name,
+                'condition': f.filter_condition,
+                'description': f.description
             }
             for f in (user_context.rls_filters or [])
         ],
         'table_permissions_count': len(user_context.table_permissions) if user_context.table_permissions else 0,
         'table_permissions': [
             {
-                'table': p.table,
+                'table': p.table_name,
                 'allowed_columns': p.allowed_columns,
                 'denied_columns': p.denied_columns
             }
@@ -2,6 +2,6 @@
 Vector package for persistent semantic search.
 """
 
-from .vector_store import VectorStore, get_vector_store
+from .vector_store import VectorStore, decode_field_metadata, get_vector_store
 
-__all__ = ['VectorStore', 'get_vector_store']
+__all__ = ['VectorStore', 'decode_field_metadata', 'get_vector_store']
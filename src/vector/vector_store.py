@@ -4,43 +4,343 @@ Vector Store Manager
 Manages ChromaDB for persistent semantic search of fields, metrics, and learned synonyms.
 """
 
+import atexit
+import hashlib
 import logging
-from typing import List, Dict, Optional, Tuple
+import queue
+import threading
+import weakref
+from collections import OrderedDict, defaultdict
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Any, List, Dict, Optional, Tuple
 from pathlib import Path
 
 import chromadb
+import orjson
 from chromadb.config import Settings
 
 logger = logging.getLogger(__name__)
 
+try:
+    import faiss
+    import numpy as np
+    HAS_FAISS = True
+except ImportError:
+    HAS_FAISS = False
+
+# Buffered records per collection before an automatic upsert
+_BATCH_SIZE = 128
+
+# Rows per page when scanning learned synonyms
+_SYNONYM_PAGE_SIZE = 1000
+
+# Same model as Chroma's default embedding function, so stored vectors stay comparable
+_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+_ENCODE_BATCH_SIZE = 128
+
+# Query embeddings remembered per store
+_QUERY_CACHE_SIZE = 2048
+
+
+@lru_cache(maxsize=64)
+def _where(
+    connection_id: Optional[str],
+    field_type: Optional[str]
+) -> Tuple[Tuple[Tuple[str, str], ...], Optional[Dict]]:
+    """
+    Build the metadata filter for a (connection_id, field_type) pair once.
+    
+    Returns the flat (key, value) conditions and the equivalent ChromaDB
+    where clause (conditions combined with $and when there is more than one).
+    Callers must not mutate the returned clause; it is shared.
+    """
+    conditions = []
+    if connection_id:
+        conditions.append(("connection_id", connection_id))
+    if field_type:
+        conditions.append(("field_type", field_type))
+    
+    if not conditions:
+        where = None
+    elif len(conditions) == 1:
+        where = dict(conditions)
+    else:
+        where = {"$and": [{key: value} for key, value in conditions]}
+    return tuple(conditions), where
+
+
+# One PersistentClient per directory, shared by every VectorStore on it. The
+# stores are tracked too: collection names are fixed, so they share collections.
+_clients: Dict[str, "chromadb.ClientAPI"] = {}
+_client_stores: Dict[str, "weakref.WeakSet[VectorStore]"] = defaultdict(weakref.WeakSet)
+_clients_lock = threading.Lock()
+
+# The unsupported-pragmas warning is logged once, not per store and writer thread
+_pragmas_unsupported_logged = False
+
+
+def _get_client(path: str) -> "chromadb.ClientAPI":
+    """Get or create the process-wide ChromaDB client for a directory."""
+    with _clients_lock:
+        client = _clients.get(path)
+        if client is None:
+            client = chromadb.PersistentClient(
+                path=path,
+                settings=Settings(
+                    anonymized_telemetry=False,
+                    allow_reset=True
+                )
+            )
+            _clients[path] = client
+        return client
+
+
+def _flush_all_stores():
+    """Flush every live store so buffered writes survive interpreter shutdown."""
+    with _clients_lock:
+        stores = [store for path_stores in _client_stores.values() for store in path_stores]
+    for store in stores:
+        try:
+            store.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush vector store at exit: {e}")
+
+
+# One hook for all stores; a per-store bound method would keep each store alive
+atexit.register(_flush_all_stores)
+
+
+def decode_field_metadata(metadata: Dict) -> Dict:
+    """
+    Decode a stored field's metadata into Python values.
+    
+    ``synonyms`` is stored as a JSON array and ``is_measure`` as a bool.
+    Rows written before that used a comma-joined string and "True"/"False",
+    and are still accepted.
+    """
+    decoded = dict(metadata)
+    
+    synonyms = metadata.get("synonyms") or ""
+    if synonyms.startswith("["):
+        decoded["synonyms"] = orjson.loads(synonyms)
+    else:
+        decoded["synonyms"] = [s.strip() for s in synonyms.split(",") if s.strip()]
+    
+    is_measure = metadata.get("is_measure", False)
+    decoded["is_measure"] = is_measure if isinstance(is_measure, bool) else is_measure == "True"
+    return decoded
+
+
+@lru_cache(maxsize=2048)
+def _field_text(
+    display_name: str,
+    column_name: str,
+    description: str,
+    synonyms: Tuple[str, ...]
+) -> str:
+    """Embedding text for a field; memoized since schema reloads re-add the same fields."""
+    base = f"Field: {display_name} | Column: {column_name} | Description: {description}"
+    return f"{base} | Also known as: {', '.join(synonyms)}" if synonyms else base
+
+
+@dataclass(slots=True)
+class FieldMeta:
+    """Metadata stored with a field embedding; converted to a dict only at upsert."""
+    connection_id: str
+    table_name: str
+    column_name: str
+    display_name: str
+    description: str
+    is_measure: bool
+    data_type: str
+    field_type: str  # "metric" or "dimension"
+    default_aggregation: str
+    synonyms: str  # JSON array
+
+
+class _FieldIndex:
+    """
+    In-process exact cosine index over field embeddings.
+    
+    Mirrors the fields collection (which stays the persistent copy) so field
+    search is a FAISS inner-product scan plus a Python metadata filter,
+    without a ChromaDB query per call.
+    """
+    
+    def __init__(self, dim: int, quantization: Optional[str] = None):
+        if quantization is None:
+            base = faiss.IndexFlatIP(dim)
+        else:
+            qtype = {
+                "fp16": faiss.ScalarQuantizer.QT_fp16,
+                "int8": faiss.ScalarQuantizer.QT_8bit_uniform,
+            }[quantization]
+            base = faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_INNER_PRODUCT)
+            if not base.is_trained:
+                # Unit vectors: every component lies in [-1, 1]
+                base.train(np.array([[-1.0] * dim, [1.0] * dim], dtype="float32"))
+        self.index = faiss.IndexIDMap2(base)
+        self.ids: List[str] = []
+        self.docs: List[str] = []
+        self.metas: List[Dict] = []
+        self.pos: Dict[str, int] = {}
+    
+    def upsert(self, ids: List[str], docs: List[str], metas: List[Dict], embeddings):
+        """Add or replace fields; each field keeps its row position as FAISS label."""
+        vecs = np.ascontiguousarray(embeddings, dtype="float32")
+        faiss.normalize_L2(vecs)
+        
+        labels = []
+        for field_id, doc, meta in zip(ids, docs, metas, strict=True):
+            row = self.pos.get(field_id)
+            if row is None:
+                row = len(self.ids)
+                self.pos[field_id] = row
+                self.ids.append(field_id)
+                self.docs.append(doc)
+                self.metas.append(meta)
+            else:
+                self.docs[row] = doc
+                self.metas[row] = meta
+            labels.append(row)
+        
+        labels = np.asarray(labels, dtype="int64")
+        self.index.remove_ids(labels)
+        self.index.add_with_ids(vecs, labels)
+    
+    def search(self, query_vec, where: Tuple[Tuple[str, str], ...], top_k: int) -> Dict:
+        """Return the top_k matches passing the (key, value) filters, in ChromaDB's result shape."""
+        total = self.index.ntotal
+        hits: List[Tuple[float, int]] = []
+        if total:
+            q = np.asarray([query_vec], dtype="float32")
+            faiss.normalize_L2(q)
+            
+            # Over-fetch when filtering; widen until enough rows pass or all were seen
+            k = min(total, top_k * 4 if where else top_k)
+            while True:
+                scores, rows = self.index.search(q, k)
+                hits = [
+                    (float(score), int(row))
+                    for score, row in zip(scores[0], rows[0], strict=True)
+                    if row >= 0 and all(self.metas[row].get(key) == value for key, value in where)
+                ]
+                if len(hits) >= top_k or k >= total:
+                    break
+                k = min(total, k * 4)
+            hits = hits[:top_k]
+        
+        # Squared L2 between unit vectors, matching the collection's default space
+        return {
+            "ids": [[self.ids[row] for _, row in hits]],
+            "metadatas": [[self.metas[row] for _, row in hits]],
+            "documents": [[self.docs[row] for _, row in hits]],
+            "distances": [[2.0 - 2.0 * score for score, _ in hits]],
+        }
+
 
 class VectorStore:
     """Manages vector embeddings for semantic search."""
     
-    def __init__(self, persist_directory: str = "./data/chroma"):
+    def __init__(
+        self,
+        persist_directory: str = "./data/chroma",
+        field_quantization: Optional[str] = None,
+        bulk_ingest: bool = False
+    ):
         """
         Initialize ChromaDB vector store.
         
         Args:
             persist_directory: Directory to persist ChromaDB data
+            field_quantization: Compress the in-memory field index: "fp16" (2x)
+                or "int8" (4x); None keeps full float32 vectors
+            bulk_ingest: Turn off SQLite fsync for fast one-off loads. A crash
+                mid-load can corrupt the store, so leave off for serving.
         """
+        if field_quantization not in (None, "fp16", "int8"):
+            raise ValueError(f"Unsupported field_quantization: {field_quantization}")
+        
         self.persist_directory = Path(persist_directory)
+        self.field_quantization = field_quantization
+        self.bulk_ingest = bulk_ingest
         self.persist_directory.mkdir(parents=True, exist_ok=True)
         
-        # Initialize ChromaDB client with persistence
-        self.client = chromadb.PersistentClient(
-            path=str(self.persist_directory),
-            settings=Settings(
-                anonymized_telemetry=False,
-                allow_reset=True
-            )
-        )
+        # Initialize ChromaDB client with persistence (shared per directory)
+        self._client_path = str(self.persist_directory.resolve())
+        self.client = _get_client(self._client_path)
+        
+        self._apply_sqlite_pragmas()
+        
+        # Pending writes per collection: id -> (document, metadata). Keyed by id
+        # so repeated writes to one record collapse (Chroma rejects duplicate
+        # ids within a single upsert).
+        self._field_buf: Dict[str, Tuple[str, FieldMeta]] = {}
+        self._syn_buf: Dict[str, Tuple[str, Dict]] = {}
+        self._query_buf: Dict[str, Tuple[str, Dict]] = {}
+        self._buf_lock = threading.Lock()
+        
+        # Batches are embedded and upserted on a background writer thread
+        self._write_q: queue.Queue = queue.Queue(maxsize=16)
+        self._writer: Optional[threading.Thread] = None
+        # First upsert failure since the last flush, re-raised by flush()
+        self._write_error: Optional[Exception] = None
+        
+        # Sentence-transformers encoder, loaded on first flush
+        self._encoder = None
+        self._encoder_unavailable = False
+        self._encoder_lock = threading.Lock()
+        
+        # field_id -> digest of its last stored or queued text and metadata, loaded on first field write
+        self._field_digests: Optional[Dict[str, bytes]] = None
+        self._digest_lock = threading.Lock()
+        
+        # FAISS mirror of the fields collection, built on first search
+        self._field_index: Optional[_FieldIndex] = None
+        self._index_lock = threading.Lock()
+        
+        # LRU of query text -> embedding; repeat questions skip the encoder
+        self._query_vecs: "OrderedDict[str, Tuple[float, ...]]" = OrderedDict()
+        self._query_vecs_lock = threading.Lock()
         
         # Create collections for different types of embeddings
         self._init_collections()
+        with _clients_lock:
+            _client_stores[self._client_path].add(self)
         
         logger.info(f"VectorStore initialized with persistence at {self.persist_directory}")
     
+    def _apply_sqlite_pragmas(self):
+        """
+        Tune the SQLite connection ChromaDB uses on the calling thread.
+        
+        WAL with synchronous=NORMAL is safe and skips most fsyncs; bulk_ingest
+        drops to synchronous=OFF. Connections are per thread, so the writer
+        thread applies these again for itself. Only ChromaDB versions with a
+        Python SQLite system DB expose the pool; others keep their defaults
+        and log a warning, since this relies on ChromaDB internals.
+        """
+        synchronous = "OFF" if self.bulk_ingest else "NORMAL"
+        server = getattr(self.client, "_server", self.client)
+        conn_pool = getattr(getattr(server, "_sysdb", None), "_conn_pool", None)
+        if conn_pool is None:
+            global _pragmas_unsupported_logged
+            if not _pragmas_unsupported_logged:
+                _pragmas_unsupported_logged = True
+                logger.warning(
+                    f"SQLite pragmas not supported on chromadb {chromadb.__version__}; "
+                    "using its default journal and sync settings"
+                )
+            return
+        try:
+            conn = conn_pool.connect()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={synchronous}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+        except Exception as e:
+            logger.warning(f"SQLite pragmas not applied on chromadb {chromadb.__version__}: {e}")
+    
     def _init_collections(self):
         """Initialize ChromaDB collections."""
         # Fields collection: stores all database fields with their metadata
@@ -61,6 +361,9 @@ class VectorStore:
             metadata={"description": "Successful query patterns"}
         )
         
+        # Bound query method for the search hot path
+        self._fq = self.fields_collection.query
+        
         logger.info("ChromaDB collections initialized")
     
     def add_field(
@@ -89,6 +392,99 @@ class VectorStore:
             data_type: Data type (numeric, string, date, etc.)
             default_aggregation: Default aggregation (sum, avg, count, etc.)
         """
+        field_id, field_text, metadata = self._field_record(
+            connection_id=connection_id,
+            table_name=table_name,
+            column_name=column_name,
+            display_name=display_name,
+            description=description,
+            is_measure=is_measure,
+            synonyms=synonyms,
+            data_type=data_type,
+            default_aggregation=default_aggregation
+        )
+        if not self._claim_field_digest(field_id, field_text, metadata):
+            logger.debug(f"Field embedding unchanged: {field_id}")
+            return
+        self._buffer(self._field_buf, field_id, field_text, metadata)
+        logger.debug(f"Queued field embedding: {field_id}")
+    
+    def add_fields_bulk(self, fields: List[Dict]):
+        """
+        Add or update many field embeddings as one batch.
+        
+        Meant for schema ingest: all fields are embedded in a single encoder
+        call and written with a single upsert, instead of in 128-record
+        slices.
+        
+        Args:
+            fields: Dicts with the same keys as add_field's arguments
+        """
+        records = [self._field_record(**field) for field in fields]
+        records = [record for record in records if self._claim_field_digest(*record)]
+        if not records:
+            return
+        with self._buf_lock:
+            for field_id, field_text, metadata in records:
+                self._field_buf[field_id] = (field_text, metadata)
+        self._submit_pending()
+        logger.debug(f"Queued {len(records)} field embeddings")
+    
+    @staticmethod
+    def _field_digest(field_text: str, metadata: "FieldMeta") -> bytes:
+        """Fingerprint a field's embedding text and metadata."""
+        payload = field_text.encode() + b"\0" + orjson.dumps(metadata)
+        return hashlib.blake2b(payload, digest_size=16).digest()
+    
+    def _claim_field_digest(self, field_id: str, field_text: str, metadata: "FieldMeta") -> bool:
+        """
+        Record a field's digest before buffering it; False if nothing changed.
+        
+        Digests track the last version stored or queued, so re-adding the
+        stored version while a different one is still pending is not skipped.
+        """
+        digests = self._load_field_digests()
+        digest = self._field_digest(field_text, metadata)
+        with self._digest_lock:
+            if digests.get(field_id) == digest:
+                return False
+            digests[field_id] = digest
+        return True
+    
+    def _load_field_digests(self) -> Dict[str, bytes]:
+        """Fingerprint the stored fields on first use."""
+        if self._field_digests is None:
+            with self._digest_lock:
+                if self._field_digests is None:
+                    digests = {}
+                    try:
+                        stored = self.fields_collection.get(include=["documents", "metadatas"])
+                        for stored_id, doc, meta in zip(
+                            stored["ids"], stored["documents"], stored["metadatas"], strict=True
+                        ):
+                            try:
+                                digests[stored_id] = self._field_digest(doc, FieldMeta(**meta))
+                            except TypeError:
+                                # Older metadata layout; the next add rewrites it
+                                continue
+                    except Exception as e:
+                        logger.warning(f"Could not load stored field digests: {e}")
+                    self._field_digests = digests
+        return self._field_digests
+    
+    def _field_record(
+        self,
+        connection_id: str,
+        table_name: str,
+        column_name: str,
+        display_name: str,
+        description: str,
+        is_measure: bool,
+        synonyms: List[str],
+        data_type: str,
+        default_aggregation: Optional[str] = None
+    ) -> Tuple[str, str, "FieldMeta"]:
+        """Build the (id, embedding text, metadata) record for a field."""
         field_id = f"{connection_id}:{table_name}.{column_name}"
         
         # Create rich text for embedding
@@ -100,29 +496,216 @@ class VectorStore:
         )
         
         # Metadata - store complete field mapping info
-        metadata = {
-            "connection_id": connection_id,
-            "table_name": table_name,
-            "column_name": column_name,
-            "display_name": display_name,
-            "description": description,
-            "is_measure": str(is_measure),
-            "data_type": data_type,
-            "field_type": "metric" if is_measure else "dimension",
-            "default_aggregation": default_aggregation or "",
-            "synonyms": ",".join(synonyms) if synonyms else ""
-        }
+        metadata = FieldMeta(
+            connection_id=connection_id,
+            table_name=table_name,
+            column_name=column_name,
+            display_name=display_name,
+            description=description,
+            is_measure=is_measure,
+            data_type=data_type,
+            field_type="metric" if is_measure else "dimension",
+            default_aggregation=default_aggregation or "",
+            synonyms=orjson.dumps(synonyms or []).decode()
+        )
+        return field_id, field_text, metadata
+    
+    def _buffer(self, buf: Dict[str, Tuple[str, Any]], record_id: str, document: str, metadata: Any):
+        """Queue a record for upsert, handing full batches to the writer thread."""
+        with self._buf_lock:
+            buf[record_id] = (document, metadata)
+            full = len(buf) >= _BATCH_SIZE
+        if full:
+            self._submit_pending()
+    
+    def _submit_pending(self):
+        """Move buffered records onto the writer queue, one batch per collection."""
+        with self._buf_lock:
+            pending = [
+                (self.fields_collection, self._field_buf),
+                (self.synonyms_collection, self._syn_buf),
+                (self.queries_collection, self._query_buf),
+            ]
+            batches = [(collection, dict(buf)) for collection, buf in pending if buf]
+            for _, buf in pending:
+                buf.clear()
+            
+            if batches and self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._writer_loop,
+                    name="vector-store-writer",
+                    daemon=True
+                )
+                self._writer.start()
         
+        # Bounded queue: producers block only when the writer is far behind
+        for batch in batches:
+            self._write_q.put(batch)
+    
+    def _writer_loop(self):
+        """Drain the writer queue, embedding and upserting one batch at a time."""
+        self._apply_sqlite_pragmas()
+        while True:
+            collection, batch = self._write_q.get()
+            try:
+                self._write_batch(collection, batch)
+            finally:
+                self._write_q.task_done()
+    
+    def _write_batch(self, collection, batch: Dict[str, Tuple[str, Any]]):
+        """Embed and upsert one batch, keeping the field index in step."""
         try:
-            # Add to collection (upsert)
-            self.fields_collection.upsert(
-                ids=[field_id],
-                documents=[field_text],
-                metadatas=[metadata]
+            ids = list(batch)
+            documents = [doc for doc, _ in batch.values()]
+            # Field metadata stays a FieldMeta until here, on the writer thread
+            metadatas = [
+                asdict(meta) if isinstance(meta, FieldMeta) else meta
+                for _, meta in batch.values()
+            ]
+            embeddings = self._encode(documents)
+            collection.upsert(
+                ids=ids,
+                documents=documents,
+                metadatas=metadatas,
+                embeddings=embeddings
             )
-            logger.debug(f"Added field embedding: {field_id}")
+            logger.debug(f"Upserted {len(batch)} records into {collection.name}")
+            
+            if collection is self.fields_collection:
+                if embeddings is not None:
+                    with self._index_lock:
+                        if self._field_index is not None:
+                            self._field_index.upsert(ids, documents, metadatas, embeddings)
+                self._invalidate_peer_field_caches(ids)
         except Exception as e:
-            logger.error(f"Failed to add field embedding {field_id}: {e}")
+            logger.error(f"Failed to upsert {len(batch)} records into {collection.name}: {e}")
+            with self._buf_lock:
+                if self._write_error is None:
+                    self._write_error = e
+            if collection is self.fields_collection:
+                # Unknown what got stored; forget the claimed digests so re-adds write again
+                with self._digest_lock:
+                    digests = self._field_digests
+                    if digests is not None:
+                        for field_id, (doc, meta) in batch.items():
+                            if digests.get(field_id) == self._field_digest(doc, meta):
+                                del digests[field_id]
+    
+    def _invalidate_peer_field_caches(self, field_ids: List[str]):
+        """
+        Drop what other stores on this directory derived from the written fields.
+        
+        Their field index is rebuilt on next search, and forgetting their
+        digests for these ids keeps a re-add of an older version from being
+        skipped as unchanged.
+        """
+        with _clients_lock:
+            peers = [store for store in _client_stores[self._client_path] if store is not self]
+        for store in peers:
+            with store._index_lock:
+                store._field_index = None
+            with store._digest_lock:
+                digests = store._field_digests
+                if digests is not None:
+                    for field_id in field_ids:
+                        digests.pop(field_id, None)
+    
+    def flush(self):
+        """
+        Upsert all buffered fields, synonyms and queries and wait for the writes.
+        
+        Each collection gets a single upsert per flush. Call this after bulk
+        ingest; reads on this store flush first on their own.
+        
+        Raises:
+            Exception: The first upsert failure on the writer thread since
+                the previous flush
+        """
+        self._submit_pending()
+        self._write_q.join()
+        with self._buf_lock:
+            error, self._write_error = self._write_error, None
+        if error is not None:
+            raise error
+    
+    def _get_field_index(self) -> Optional[_FieldIndex]:
+        """Build the FAISS field index from the fields collection on first use."""
+        if not HAS_FAISS or self._get_encoder() is None:
+            return None
+        
+        with self._index_lock:
+            if self._field_index is None:
+                stored = self.fields_collection.get(include=["embeddings", "documents", "metadatas"])
+                field_index = _FieldIndex(
+                    self._encoder.get_sentence_embedding_dimension(),
+                    quantization=self.field_quantization
+                )
+                if stored["ids"]:
+                    field_index.upsert(
+                        stored["ids"],
+                        stored["documents"],
+                        stored["metadatas"],
+                        stored["embeddings"]
+                    )
+                self._field_index = field_index
+                logger.info(f"Field index built with {len(field_index.ids)} fields")
+            return self._field_index
+    
+    def _get_encoder(self):
+        """Load the sentence-transformers encoder once; None if it cannot be loaded."""
+        if self._encoder is None and not self._encoder_unavailable:
+            with self._encoder_lock:
+                if self._encoder is None and not self._encoder_unavailable:
+                    try:
+                        import torch
+                        from sentence_transformers import SentenceTransformer
+                        device = "cuda" if torch.cuda.is_available() else "cpu"
+                        self._encoder = SentenceTransformer(_EMBEDDING_MODEL, device=device)
+                        logger.info(f"VectorStore encoder loaded on {device}")
+                    except ImportError:
+                        logger.warning("sentence-transformers not available, ChromaDB will embed documents")
+                        self._encoder_unavailable = True
+                    except Exception as e:
+                        # Model download/load failed (offline, corrupt cache, ...)
+                        logger.warning(f"Encoder failed to load, ChromaDB will embed documents: {e}")
+                        self._encoder_unavailable = True
+        return self._encoder
+    
+    def _encode(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """
+        Embed a batch of texts in one vectorized call.
+        
+        Returns None when no encoder is available, in which case ChromaDB
+        falls back to embedding the documents itself.
+        """
+        encoder = self._get_encoder()
+        if encoder is None:
+            return None
+        embeddings = encoder.encode(
+            texts,
+            batch_size=_ENCODE_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+        return embeddings.tolist()
+    
+    def _embed_query(self, text: str) -> Optional[Tuple[float, ...]]:
+        """Embed one query text, memoized (None when no encoder is available)."""
+        with self._query_vecs_lock:
+            vec = self._query_vecs.get(text)
+            if vec is not None:
+                self._query_vecs.move_to_end(text)
+                return vec
+        
+        embeddings = self._encode([text])
+        if embeddings is None:
+            return None
+        vec = tuple(embeddings[0])
+        with self._query_vecs_lock:
+            self._query_vecs[text] = vec
+            if len(self._query_vecs) > _QUERY_CACHE_SIZE:
+                self._query_vecs.popitem(last=False)
+        return vec
     
     def _create_field_text(
         self,
@@ -132,16 +715,7 @@ class VectorStore:
         column_name: str
     ) -> str:
         """Create rich text for field embedding."""
-        parts = [
-            f"Field: {display_name}",
-            f"Column: {column_name}",
-            f"Description: {description}",
-        ]
-        
-        if synonyms:
-            parts.append(f"Also known as: {', '.join(synonyms)}")
-        
-        return " | ".join(parts)
+        return _field_text(display_name, column_name, description, tuple(synonyms) if synonyms else ())
     
     def search_fields(
         self,
@@ -162,40 +736,51 @@ class VectorStore:
         Returns:
             List of matching fields with metadata and scores
         """
-        # Build where filter
-        where_filter = {}
-        if connection_id:
-            where_filter["connection_id"] = connection_id
-        if field_type:
-            where_filter["field_type"] = field_type
+        self.flush()
+        
+        conditions, where_filter = _where(connection_id, field_type)
         
         try:
-            results = self.fields_collection.query(
-                query_texts=[query],
-                n_results=top_k,
-                where=where_filter if where_filter else None
-            )
+            query_vec = self._embed_query(query)
+            field_index = self._get_field_index() if query_vec is not None else None
+            if field_index is not None:
+                with self._index_lock:
+                    results = field_index.search(query_vec, conditions, top_k)
+            elif query_vec is not None:
+                results = self._fq(
+                    query_embeddings=[list(query_vec)],
+                    n_results=top_k,
+                    where=where_filter
+                )
+            else:
+                results = self._fq(
+                    query_texts=[query],
+                    n_results=top_k,
+                    where=where_filter
+                )
             
-            # Format results
-            matches = []
-            if results['ids'] and results['ids'][0]:
-                for i, field_id in enumerate(results['ids'][0]):
-                    metadata = results['metadatas'][0][i]
-                    distance = results['distances'][0][i] if results.get('distances') else 0
-                    
-                    matches.append({
-                        "field_id": field_id,
-                        "connection_id": metadata.get("connection_id"),
-                        "table_name": metadata.get("table_name"),
-                        "column_name": metadata.get("column_name"),
-                        "display_name": metadata.get("display_name"),
-                        "field_type": metadata.get("field_type"),
-                        "data_type": metadata.get("data_type"),
-                        "similarity": 1 - distance,  # Convert distance to similarity
-                        "matched_text": results['documents'][0][i]
-                    })
+            # Format results column-wise
+            if not results['ids'] or not results['ids'][0]:
+                return []
             
-            return matches
+            ids = results['ids'][0]
+            distances = results['distances'][0] if results.get('distances') else [0.0] * len(ids)
+            return [
+                {
+                    "field_id": field_id,
+                    "connection_id": metadata["connection_id"],
+                    "table_name": metadata["table_name"],
+                    "column_name": metadata["column_name"],
+                    "display_name": metadata["display_name"],
+                    "field_type": metadata["field_type"],
+                    "data_type": metadata["data_type"],
+                    "similarity": 1 - distance,  # Convert distance to similarity
+                    "matched_text": document
+                }
+                for field_id, metadata, document, distance in zip(
+                    ids, results['metadatas'][0], results['documents'][0], distances, strict=True
+                )
+            ]
         except Exception as e:
             logger.error(f"Field search failed: {e}")
             return []
@@ -230,56 +815,56 @@ class VectorStore:
             "field_type": field_type
         }
         
-        try:
-            self.synonyms_collection.upsert(
-                ids=[synonym_id],
-                documents=[synonym_text],
-                metadatas=[metadata]
-            )
-            logger.info(f"Learned synonym: '{user_term}' → '{matched_field}'")
-        except Exception as e:
-            logger.error(f"Failed to store learned synonym: {e}")
+        self._buffer(self._syn_buf, synonym_id, synonym_text, metadata)
+        logger.info(f"Learned synonym: '{user_term}' → '{matched_field}'")
     
     def get_learned_synonyms(
         self,
         connection_id: str,
-        field_type: Optional[str] = None
+        field_type: Optional[str] = None,
+        limit: int = 10_000
     ) -> Dict[str, List[str]]:
         """
-        Get all learned synonyms for a connection.
+        Get learned synonyms for a connection.
         
         Args:
             connection_id: Database connection ID
             field_type: Filter by "metric" or "dimension" (optional)
+            limit: Maximum synonym rows to read
         
         Returns:
             Dictionary of {field_name: [synonyms]}
         """
-        where_filter = {"connection_id": connection_id}
-        if field_type:
-            where_filter["field_type"] = field_type
+        self.flush()
+        
+        _, where_filter = _where(connection_id, field_type)
         
         try:
-            # Get all synonyms for this connection
-            results = self.synonyms_collection.get(
-                where=where_filter,
-                include=["metadatas"]
-            )
+            # Group by matched field; dict keys dedupe terms in O(1) and keep first-seen order
+            grouped = defaultdict(dict)
             
-            # Group by matched field
-            synonyms_dict = {}
-            if results['metadatas']:
-                for metadata in results['metadatas']:
+            # Page through metadata only, so peak memory stays at one page
+            offset = 0
+            while offset < limit:
+                page_size = min(_SYNONYM_PAGE_SIZE, limit - offset)
+                results = self.synonyms_collection.get(
+                    where=where_filter,
+                    include=["metadatas"],
+                    limit=page_size,
+                    offset=offset
+                )
+                metadatas = results['metadatas'] or ()
+                for metadata in metadatas:
                     matched_field = metadata.get("matched_field")
                     user_term = metadata.get("user_term")
-                    
                     if matched_field and user_term:
-                        if matched_field not in synonyms_dict:
-                            synonyms_dict[matched_field] = []
-                        if user_term not in synonyms_dict[matched_field]:
-                            synonyms_dict[matched_field].append(user_term)
+                        grouped[matched_field][user_term] = None
+                
+                if len(metadatas) < page_size:
+                    break
+                offset += page_size
             
-            return synonyms_dict
+            return {field: list(terms) for field, terms in grouped.items()}
         except Exception as e:
             logger.error(f"Failed to get learned synonyms: {e}")
             return {}
@@ -303,8 +888,11 @@ class VectorStore:
             query_id: Optional unique query ID
         """
         if not query_id:
-            import hashlib
-            query_id = hashlib.md5(f"{connection_id}:{user_query}".encode()).hexdigest()[:16]
+            # Non-cryptographic fingerprint; kept as MD5 so ids match rows already stored
+            query_id = hashlib.md5(
+                f"{connection_id}:{user_query}".encode(),
+                usedforsecurity=False
+            ).hexdigest()[:16]
         
         query_text = f"Question: {user_query} | Metric: {metric} | Dimensions: {', '.join(dimensions)}"
         
@@ -314,18 +902,12 @@ class VectorStore:
             "dimension_count": str(len(dimensions))
         }
         
-        try:
-            self.queries_collection.upsert(
-                ids=[query_id],
-                documents=[query_text],
-                metadatas=[metadata]
-            )
-            logger.debug(f"Recorded successful query: {query_id}")
-        except Exception as e:
-            logger.error(f"Failed to record query: {e}")
+        self._buffer(self._query_buf, query_id, query_text, metadata)
+        logger.debug(f"Recorded successful query: {query_id}")
     
     def get_stats(self) -> Dict:
         """Get statistics about the vector store."""
+        self.flush()
         return {
             "fields_count": self.fields_collection.count(),
             "learned_synonyms_count": self.synonyms_collection.count(),
@@ -334,19 +916,54 @@ class VectorStore:
         }
     
     def reset(self):
-        """Reset all collections (for testing)."""
+        """
+        Reset all collections (for testing).
+        
+        Collection names are fixed, so every VectorStore on the same persist
+        directory shares them: all of those stores lose their pending writes
+        and caches and are rebound to the new, empty collections.
+        """
         logger.warning("Resetting all vector store collections")
-        self.client.reset()
-        self._init_collections()
+        with _clients_lock:
+            stores = list(_client_stores[self._client_path])
+        for store in stores:
+            store._discard_pending()
+        
+        # Drop the collections rather than calling client.reset(), which
+        # rebuilds every system table in the directory
+        for collection in (self.fields_collection, self.synonyms_collection, self.queries_collection):
+            try:
+                self.client.delete_collection(collection.name)
+            except Exception as e:
+                logger.debug(f"Could not delete collection {collection.name}: {e}")
+        for store in stores:
+            store._init_collections()
+    
+    def _discard_pending(self):
+        """Drop buffered writes and the caches derived from stored fields."""
+        with self._buf_lock:
+            self._field_buf.clear()
+            self._syn_buf.clear()
+            self._query_buf.clear()
+        self._write_q.join()
+        with self._buf_lock:
+            self._write_error = None
+        with self._index_lock:
+            self._field_index = None
+        with self._digest_lock:
+            self._field_digests = None
 
 
 # Global instance
 _vector_store: Optional[VectorStore] = None
+_vector_store_lock = threading.Lock()
 
 
 def get_vector_store() -> VectorStore:
-    """Get or create the global vector store instance."""
+    """Get or create the global vector store instance (thread-safe)."""
     global _vector_store
     if _vector_store is None:
-        _vector_store = VectorStore()
+        with _vector_store_lock:
+            if _vector_store is None:
+                _vector_store = VectorStore()
     return _vector_store
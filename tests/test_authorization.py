@@ -0,0 +1,98 @@
+"""Tests for permission masks, admin checks and authorization cache invalidation."""
+
+import pytest
+
+from src.user.authorization import (
+    AuthorizationCache,
+    AuthorizationValidator,
+    Permission,
+    Role,
+    TablePermission,
+    UserContext,
+)
+
+
+def make_user(user_id, roles, **kwargs):
+    return UserContext(user_id=user_id, username=user_id, roles=roles, **kwargs)
+
+
+def test_permission_mask_round_trip():
+    user = make_user("u1", [Role.VIEWER], custom_permissions=Permission.QUERY_DATA | Permission.MANAGE_RLS)
+
+    dumped = user.model_dump()
+    assert dumped["custom_permissions"] == ["query_data", "manage_rls"]
+
+    restored = UserContext(**dumped)
+    assert restored.custom_permissions == Permission.QUERY_DATA | Permission.MANAGE_RLS
+    assert restored.has_permission(Permission.MANAGE_RLS)
+    assert str(restored.custom_permissions) == "query_data|manage_rls"
+
+
+@pytest.mark.parametrize(
+    "legacy",
+    [
+        ["query_data", "manage_rls"],
+        {"QUERY_DATA", "MANAGE_RLS"},
+        ("query_data", Permission.MANAGE_RLS),
+    ],
+)
+def test_legacy_permission_list_is_folded_into_mask(legacy):
+    user = make_user("u1", [Role.VIEWER], custom_permissions=legacy)
+    assert user.custom_permissions == Permission.QUERY_DATA | Permission.MANAGE_RLS
+    assert user.has_permission(Permission.QUERY_DATA)
+    assert not user.has_permission(Permission.MANAGE_USERS)
+
+
+def test_unknown_permission_name_is_rejected():
+    with pytest.raises(ValueError, match="Unknown permission: launch_missiles"):
+        Permission.from_iterable(["query_data", "launch_missiles"])
+    with pytest.raises(ValueError):
+        make_user("u1", [Role.VIEWER], custom_permissions=["launch_missiles"])
+
+
+def test_admin_passes_checks_without_caching():
+    validator = AuthorizationValidator()
+    admin = make_user(
+        "admin",
+        [Role.ADMIN],
+        table_permissions=[TablePermission(table_name="orders", denied_columns=["ssn"])],
+    )
+
+    assert validator.validate_table_access(admin, "payroll") == (True, None)
+    assert validator.validate_column_access(admin, "orders", "ssn") == (True, None)
+    assert validator.validate_metric_access(admin, "revenue") == (True, None)
+    assert validator.validate_table_access(admin.to_core(), "payroll") == (True, None)
+    assert validator.cache.size() == 0
+
+
+def test_role_change_invalidates_users_with_that_role():
+    validator = AuthorizationValidator()
+    analyst = make_user(
+        "analyst",
+        [Role.ANALYST],
+        table_permissions=[TablePermission(table_name="orders", can_query=True)],
+    )
+    viewer = make_user("viewer", [Role.VIEWER])
+
+    assert validator.validate_table_access(analyst, "orders") == (True, None)
+    assert validator.validate_table_access(viewer, "orders")[0] is False
+    assert validator.cache.size() == 2
+
+    validator.publish_change(role=Role.ANALYST)
+    assert validator.cache.get_table("analyst", "orders") is None
+    assert validator.cache.get_table("viewer", "orders") is False
+
+
+def test_role_index_follows_role_changes():
+    cache = AuthorizationCache()
+    cache.register_user("u1", [Role.ANALYST])
+    cache.set_table("u1", "orders", True)
+
+    # u1 moved to VIEWER: an ANALYST change must no longer reach it
+    cache.register_user("u1", [Role.VIEWER])
+    cache.publish_change(role=Role.ANALYST)
+    assert cache.get_table("u1", "orders") is True
+
+    cache.publish_change(role=Role.VIEWER)
+    assert cache.get_table("u1", "orders") is None
+    assert Role.VIEWER not in cache._users_by_role
@@ -0,0 +1,231 @@
+"""Tests for RLS configuration audit writes and the config cache."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from src.user import rls_config_api
+from src.user.rls_config_api import (
+    AuditWriter,
+    RLSFilterCreate,
+    RLSFilterUpdate,
+    _ConfigCache,
+    get_user_rls_config,
+    log_audit,
+    update_rls_filter,
+)
+
+
+class FakeEngine:
+    """Records COPY and INSERT writes; can be told to fail either."""
+
+    def __init__(self, copy_fails=False, insert_failures=0):
+        self.copy_fails = copy_fails
+        self.insert_failures = insert_failures
+        self.copied = []
+        self.inserted = []
+
+    @asynccontextmanager
+    async def connect(self):
+        yield _FakeConn(self)
+
+    @asynccontextmanager
+    async def begin(self):
+        yield _FakeConn(self)
+
+
+class _FakeConn:
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def get_raw_connection(self):
+        return SimpleNamespace(driver_connection=self)
+
+    async def copy_records_to_table(self, table, records, columns):
+        if self.engine.copy_fails:
+            raise RuntimeError("COPY failed")
+        self.engine.copied.extend(records)
+
+    async def execute(self, statement, params):
+        if self.engine.insert_failures:
+            self.engine.insert_failures -= 1
+            raise RuntimeError("INSERT failed")
+        self.engine.inserted.extend(params)
+
+
+def make_record(entity_id):
+    return (7, 3, "CREATE", "RLS_FILTER", entity_id, None, '{"a":1}', 1, None, None)
+
+
+async def test_audit_batch_is_copied():
+    engine = FakeEngine()
+    writer = AuditWriter()
+    writer._engine = engine
+
+    await writer._flush([make_record(1), make_record(2)])
+    assert engine.copied == [make_record(1), make_record(2)]
+    assert engine.inserted == []
+
+
+async def test_audit_batch_falls_back_to_insert_when_copy_fails():
+    engine = FakeEngine(copy_fails=True, insert_failures=1)
+    writer = AuditWriter(retry_backoff=0)
+    writer._engine = engine
+
+    await writer._flush([make_record(1), make_record(2)])
+    assert [row["entity_id"] for row in engine.inserted] == [1, 2]
+    assert engine.inserted[0]["new_value"] == '{"a":1}'
+
+
+async def test_audit_batch_dropped_only_after_all_retries():
+    engine = FakeEngine(copy_fails=True, insert_failures=3)
+    writer = AuditWriter(max_retries=3, retry_backoff=0)
+    writer._engine = engine
+
+    await writer._flush([make_record(1)])
+    assert engine.insert_failures == 0
+    assert engine.inserted == []
+
+
+async def test_audit_record_is_queued_only_after_commit(monkeypatch):
+    engine = FakeEngine()
+    writer = AuditWriter(flush_interval=0)
+    monkeypatch.setattr(rls_config_api, "_audit_writer", writer)
+    writer.start()
+
+    db = SimpleNamespace(sync_session=Session(), bind=engine)
+    await log_audit(db, 7, 3, "CREATE", "RLS_FILTER", 1, new_value={"a": 1}, performed_by=1)
+    assert writer._queue.qsize() == 0
+
+    db.sync_session.commit()
+    assert writer._queue.qsize() == 1
+
+    await writer.stop()
+    assert engine.copied == [make_record(1)]
+
+
+async def test_rolled_back_audit_record_is_never_queued(monkeypatch):
+    writer = AuditWriter()
+    monkeypatch.setattr(rls_config_api, "_audit_writer", writer)
+    writer.start()
+
+    db = SimpleNamespace(sync_session=Session(), bind=FakeEngine())
+    db.sync_session.begin()  # the endpoint's change opened the transaction
+    await log_audit(db, 7, 3, "CREATE", "RLS_FILTER", 1, new_value={"a": 1}, performed_by=1)
+    db.sync_session.rollback()
+
+    # A later, unrelated commit on the same session must not log the change
+    db.sync_session.commit()
+    assert writer._queue.qsize() == 0
+    await writer.stop()
+
+
+async def test_audit_record_is_inserted_inline_without_writer(monkeypatch):
+    monkeypatch.setattr(rls_config_api, "_audit_writer", AuditWriter())
+    executed = []
+
+    class _Session:
+        async def execute(self, statement, params):
+            executed.append(params)
+
+    await log_audit(_Session(), 7, 3, "DELETE", "RLS_FILTER", 1, old_value={"a": 1}, performed_by=1)
+    assert executed[0]["action"] == "DELETE"
+    assert executed[0]["old_value"] == '{"a":1}'
+
+
+@pytest.fixture
+def config_cache(monkeypatch):
+    cache = _ConfigCache()
+    monkeypatch.setattr(rls_config_api, "_config_cache", cache)
+    return cache
+
+
+async def test_concurrent_cache_misses_load_once(monkeypatch, config_cache):
+    loads = []
+
+    async def fake_load(db, user_id, connection_id):
+        loads.append((user_id, connection_id))
+        await asyncio.sleep(0.01)
+        return object()
+
+    monkeypatch.setattr(rls_config_api, "_load_user_rls_config", fake_load)
+    user = {"user_id": "7", "role": "analyst"}
+
+    results = await asyncio.gather(*(get_user_rls_config(7, 3, db=None, current_user=user) for _ in range(5)))
+    assert loads == [(7, 3)]
+    assert all(result is results[0] for result in results)
+
+
+async def test_failed_load_releases_its_lock(monkeypatch, config_cache):
+    async def failing_load(db, user_id, connection_id):
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(rls_config_api, "_load_user_rls_config", failing_load)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await get_user_rls_config(7, 3, db=None, current_user={"user_id": "7", "role": "analyst"})
+    assert exc_info.value.status_code == 500
+    assert config_cache._locks == {}
+
+
+def test_expired_entry_releases_its_lock(monkeypatch, config_cache):
+    config_cache.lock((7, 3))
+    config_cache.set((7, 3), object())
+    monkeypatch.setattr(rls_config_api.time, "monotonic", lambda: float("inf"))
+
+    assert config_cache.get((7, 3)) is None
+    assert config_cache._locks == {}
+
+
+def make_filter(operator, filter_value):
+    return RLSFilterCreate(
+        user_id=7,
+        connection_id=3,
+        table_name="orders",
+        column_name="region",
+        operator=operator,
+        filter_value=filter_value,
+    )
+
+
+@pytest.mark.parametrize(
+    "operator, filter_value",
+    [("=", ["US"]), ("=", {"a": 1}), ("IN", []), ("NOT IN", []), ("IN", [1, [2]]), ("<", float("nan"))],
+)
+def test_unrenderable_filter_is_rejected(operator, filter_value):
+    with pytest.raises(ValidationError):
+        make_filter(operator, filter_value)
+    with pytest.raises(ValidationError):
+        RLSFilterUpdate(operator=operator, filter_value=filter_value)
+
+
+@pytest.mark.parametrize(
+    "operator, filter_value",
+    [("=", "US"), ("IN", ["US", "CA"]), (">=", 10), ("IS NULL", None)],
+)
+def test_renderable_filter_is_accepted(operator, filter_value):
+    assert make_filter(operator, filter_value).filter_value == filter_value
+
+
+async def test_update_leaving_an_unrenderable_filter_is_rolled_back():
+    class _Session:
+        rolled_back = False
+
+        async def execute(self, statement, params):
+            # Stored operator is IN; the update only sets an empty value
+            row = (1, 7, 3, "orders", "region", "IN", [], True, None, None, 1, "IN", ["US"], True)
+            return SimpleNamespace(fetchone=lambda: row)
+
+        async def rollback(self):
+            self.rolled_back = True
+
+    db = _Session()
+    with pytest.raises(HTTPException) as exc_info:
+        await update_rls_filter(1, RLSFilterUpdate(filter_value=[]), db=db, current_user={"user_id": "1"})
+    assert exc_info.value.status_code == 422
+    assert db.rolled_back
@@ -0,0 +1,72 @@
+"""Regression tests for RLS filter injection."""
+
+import pytest
+
+from src.user.authorization import Role, RLSFilter, UserContext
+from src.user.rls_engine import RLSEngine
+
+
+@pytest.fixture
+def engine():
+    return RLSEngine(enable_audit=False)
+
+
+@pytest.fixture
+def user():
+    return UserContext(
+        user_id="user_1",
+        username="tenant.user",
+        roles=[Role.ANALYST],
+        rls_filters=[RLSFilter(table_name="orders", filter_condition="tenant_id = 5")],
+    )
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        # Clause keywords inside a string literal must not pick the insertion point
+        (
+            "SELECT 'limit' AS x FROM orders o",
+            "SELECT 'limit' AS x FROM orders o WHERE (tenant_id = 5)",
+        ),
+        (
+            "SELECT 'order by' FROM orders ORDER BY 1",
+            "SELECT 'order by' FROM orders WHERE (tenant_id = 5) ORDER BY 1",
+        ),
+        # ... nor inside a comment, and the filter must not land in one
+        (
+            "SELECT * FROM orders -- limit\n",
+            "SELECT * FROM orders -- limit\n WHERE (tenant_id = 5)",
+        ),
+        (
+            "SELECT * FROM orders --x",
+            "SELECT * FROM orders --x\n WHERE (tenant_id = 5)",
+        ),
+        (
+            "SELECT * FROM orders -- c\nLIMIT 5",
+            "SELECT * FROM orders -- c\n WHERE (tenant_id = 5) LIMIT 5",
+        ),
+        (
+            "SELECT * FROM orders WHERE a = 1 -- c\nLIMIT 5",
+            "SELECT * FROM orders WHERE (a = 1 -- c\n) AND (tenant_id = 5) LIMIT 5",
+        ),
+    ],
+)
+def test_filter_ignores_literals_and_comments(engine, user, sql, expected):
+    assert engine.inject_rls(sql, user).rewritten_sql == expected
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT * FROM /* x */ orders",
+        "SELECT * FROM -- x\n orders",
+        "SELECT * FROM ONLY orders",
+        "SELECT * FROM LATERAL orders",
+        "SELECT * FROM `orders`",
+    ],
+)
+def test_governed_table_found_behind_comment_or_modifier(engine, user, sql):
+    result = engine.inject_rls(sql, user)
+    assert result.tables_affected == ["orders"]
+    assert result.rewritten_sql.endswith("WHERE (tenant_id = 5)")
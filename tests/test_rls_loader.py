@@ -0,0 +1,146 @@
+"""Tests for building UserContext from RLS configuration rows."""
+
+import pytest
+
+from src.user import rls_loader
+from src.user.authorization import Role
+from src.user.rls_engine import RLSEngine
+from src.user.rls_loader import bump_rls_config_version, get_rls_summary, load_user_rls_context
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakeSession:
+    """Stands in for AsyncSession; returns fixed loader rows."""
+
+    def __init__(self, rows, on_execute=None):
+        self.rows = rows
+        self.on_execute = on_execute
+        self.calls = 0
+
+    async def execute(self, query, params):
+        self.calls += 1
+        if self.on_execute is not None:
+            self.on_execute()
+        return _Result(self.rows)
+
+
+# (src, c1, c2, c3, c4, v, b) as produced by _LOAD_CONTEXT_QUERY
+ROWS = [
+    ("user", "tenant.user", "tenant@example.com", None, None, None, None),
+    ("role", "ANALYST", None, None, None, None, None),
+    ("filter", "orders", "region", "=", None, "US", None),
+    ("filter", "orders", "tenant_id", "IN", None, [1, 2], None),
+    ("filter", "customers", "deleted_at", "IS NULL", None, None, None),
+    ("perm", "orders", '["id", "amount"]', '["ssn"]', None, None, True),
+    ("perm", "payroll", None, None, None, None, False),
+]
+
+
+@pytest.fixture(autouse=True)
+def clear_context_cache():
+    rls_loader._context_cache.clear()
+    yield
+    rls_loader._context_cache.clear()
+
+
+async def test_builds_context_from_rows():
+    user = await load_user_rls_context(FakeSession(ROWS), 7, 3)
+
+    assert user.user_id == "7"
+    assert user.username == "tenant.user"
+    assert user.email == "tenant@example.com"
+    assert user.roles == [Role.ANALYST]
+    assert not user.is_admin()
+
+    assert user.get_rls_filters_for_table("orders") == ["region = 'US'", "tenant_id IN (1, 2)"]
+    assert user.get_rls_filters_for_table("customers") == ["deleted_at IS NULL"]
+
+    orders, payroll = user.table_permissions
+    assert (orders.can_query, orders.can_view) == (True, True)
+    assert orders.allowed_columns == ["id", "amount"]
+    assert orders.denied_columns == ["ssn"]
+    assert (payroll.can_query, payroll.can_view) == (False, False)
+    assert user.can_access_table("orders")
+    assert not user.can_access_table("payroll")
+
+    summary = get_rls_summary(user)
+    assert summary["roles"] == ["analyst"]
+    assert summary["rls_filters_count"] == 3
+    assert summary["table_permissions_count"] == 2
+    assert summary["table_permissions"][0] == {
+        "table": "orders",
+        "allowed_columns": ["id", "amount"],
+        "denied_columns": ["ssn"],
+    }
+
+
+async def test_missing_role_defaults_to_viewer():
+    rows = [r for r in ROWS if r[0] != "role"]
+    user = await load_user_rls_context(FakeSession(rows), 7, 3)
+    assert user.roles == [Role.VIEWER]
+
+
+@pytest.mark.parametrize(
+    "column, operator, value",
+    [
+        ("region", "= region OR 1=1 --", "US"),
+        ("region", "=", ["US"]),
+        ("region", "=", float("nan")),
+        ("region", "<", float("inf")),
+        ("region", "=", {"a": 1}),
+        ("region", "IN", [1, [2]]),
+    ],
+)
+async def test_invalid_filter_row_denies_the_table(column, operator, value):
+    rows = ROWS[:2] + [
+        ("filter", "orders", column, operator, None, value, None),
+        ("filter", "customers", "deleted_at", "IS NULL", None, None, None),
+        ("perm", "orders", None, None, None, None, True),
+        ("perm", "customers", None, None, None, None, True),
+    ]
+    user = await load_user_rls_context(FakeSession(rows), 7, 3)
+
+    # The bad row never leaves the granted table unfiltered
+    assert user.get_rls_filters_for_table("orders") == ["FALSE"]
+    assert not user.can_access_table("orders")
+    rewritten = RLSEngine(enable_audit=False).inject_rls("SELECT * FROM orders", user).rewritten_sql
+    assert rewritten == "SELECT * FROM orders WHERE (FALSE)"
+
+    # Other tables keep their own filters and grants
+    assert user.get_rls_filters_for_table("customers") == ["deleted_at IS NULL"]
+    assert user.can_access_table("customers")
+
+
+async def test_unsafe_column_name_is_quoted():
+    rows = ROWS[:2] + [("filter", "orders", 'region = region OR 1=1 --"', "=", None, "US", None)]
+    user = await load_user_rls_context(FakeSession(rows), 7, 3)
+    assert user.get_rls_filters_for_table("orders") == ['"region = region OR 1=1 --""" = \'US\'']
+
+
+async def test_context_is_cached_until_version_bump():
+    db = FakeSession(ROWS)
+    first = await load_user_rls_context(db, 7, 3)
+    assert await load_user_rls_context(db, 7, 3) is first
+    assert db.calls == 1
+
+    bump_rls_config_version()
+    assert await load_user_rls_context(db, 7, 3) is not first
+    assert db.calls == 2
+
+
+async def test_load_racing_a_version_bump_is_not_cached():
+    db = FakeSession(ROWS, on_execute=bump_rls_config_version)
+    await load_user_rls_context(db, 7, 3)
+    assert (7, 3) not in rls_loader._context_cache
+
+    db.on_execute = None
+    await load_user_rls_context(db, 7, 3)
+    assert db.calls == 2
+    assert (7, 3) in rls_loader._context_cache
@@ -0,0 +1,181 @@
+"""Tests for VectorStore buffering, change detection, reset and search."""
+
+import hashlib
+
+import numpy as np
+import pytest
+
+from src.vector import vector_store as vs
+from src.vector.vector_store import VectorStore
+
+
+class StubEncoder:
+    """Deterministic 16-d unit vectors derived from the text."""
+
+    def get_sentence_embedding_dimension(self):
+        return 16
+
+    def encode(self, texts, **kwargs):
+        vecs = np.array(
+            [np.frombuffer(hashlib.sha256(t.encode()).digest()[:16], dtype=np.uint8) for t in texts],
+            dtype="float32",
+        ) + 1.0
+        return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+@pytest.fixture(autouse=True)
+def stub_encoder(monkeypatch):
+    encoder = StubEncoder()
+    monkeypatch.setattr(VectorStore, "_get_encoder", lambda self: encoder)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return VectorStore(str(tmp_path))
+
+
+def add(store, column, connection_id="c1", is_measure=True, display_name=None):
+    store.add_field(
+        connection_id=connection_id,
+        table_name="orders",
+        column_name=column,
+        display_name=display_name or column.title(),
+        description=f"{column} of the order",
+        is_measure=is_measure,
+        synonyms=[],
+        data_type="numeric" if is_measure else "string",
+    )
+
+
+def count_upserts(monkeypatch, store):
+    calls = []
+    upsert = store.fields_collection.upsert
+
+    def counting_upsert(**kwargs):
+        calls.append(kwargs["ids"])
+        return upsert(**kwargs)
+
+    monkeypatch.setattr(store.fields_collection, "upsert", counting_upsert)
+    return calls
+
+
+def test_flush_writes_buffered_records(store):
+    add(store, "amount")
+    add(store, "region", is_measure=False)
+    assert store.fields_collection.count() == 0
+
+    store.flush()
+    assert store.fields_collection.count() == 2
+    stored = store.fields_collection.get(ids=["c1:orders.amount"])
+    assert vs.decode_field_metadata(stored["metadatas"][0])["is_measure"] is True
+
+
+def test_flush_reraises_writer_errors(monkeypatch, store):
+    failing = [True]
+    upsert = store.fields_collection.upsert
+
+    def failing_upsert(**kwargs):
+        if failing:
+            raise RuntimeError("disk full")
+        return upsert(**kwargs)
+
+    monkeypatch.setattr(store.fields_collection, "upsert", failing_upsert)
+    add(store, "amount")
+    with pytest.raises(RuntimeError, match="disk full"):
+        store.flush()
+
+    # Reported once; the failed field is written again on the next add
+    store.flush()
+    failing.clear()
+    add(store, "amount")
+    store.flush()
+    assert store.fields_collection.count() == 1
+
+
+def test_unchanged_readd_is_skipped(monkeypatch, tmp_path, store):
+    calls = count_upserts(monkeypatch, store)
+    add(store, "amount")
+    store.flush()
+    add(store, "amount")
+    store.flush()
+    assert calls == [["c1:orders.amount"]]
+
+    add(store, "amount", display_name="Order Amount")
+    store.flush()
+    assert len(calls) == 2
+
+    # A new store on the directory fingerprints what is already stored
+    other = VectorStore(str(tmp_path))
+    other_calls = count_upserts(monkeypatch, other)
+    add(other, "amount", display_name="Order Amount")
+    other.flush()
+    assert other_calls == []
+
+
+def test_peer_write_is_not_undone_by_a_stale_digest(tmp_path):
+    a = VectorStore(str(tmp_path))
+    b = VectorStore(str(tmp_path))
+
+    add(a, "amount", display_name="Old Name")
+    a.flush()
+    add(b, "amount", display_name="New Name")
+    b.flush()
+    add(a, "amount", display_name="Old Name")
+    a.flush()
+
+    stored = a.fields_collection.get(ids=["c1:orders.amount"])
+    assert stored["metadatas"][0]["display_name"] == "Old Name"
+
+
+def test_reset_empties_and_rebinds_peer_stores(tmp_path):
+    a = VectorStore(str(tmp_path))
+    b = VectorStore(str(tmp_path))
+    add(a, "amount")
+    a.flush()
+    add(b, "region", is_measure=False)  # pending on the peer, dropped by reset
+    old_collection = b.fields_collection
+
+    a.reset()
+    assert b.fields_collection is not old_collection
+    assert b.get_stats()["fields_count"] == 0
+    assert a.get_stats()["fields_count"] == 0
+
+    add(b, "region", is_measure=False)
+    b.flush()
+    assert [r["field_id"] for r in a.search_fields("region")] == ["c1:orders.region"]
+
+
+def test_search_fields_filters_by_connection_and_type(store):
+    add(store, "amount")
+    add(store, "region", is_measure=False)
+    add(store, "amount", connection_id="c2")
+
+    def field_ids(**kwargs):
+        return sorted(r["field_id"] for r in store.search_fields("amount", **kwargs))
+
+    assert field_ids() == ["c1:orders.amount", "c1:orders.region", "c2:orders.amount"]
+    assert field_ids(connection_id="c1") == ["c1:orders.amount", "c1:orders.region"]
+    assert field_ids(field_type="metric") == ["c1:orders.amount", "c2:orders.amount"]
+    assert field_ids(connection_id="c1", field_type="dimension") == ["c1:orders.region"]
+
+
+def test_learned_synonyms_are_paged_and_deduplicated(monkeypatch, store):
+    monkeypatch.setattr(vs, "_SYNONYM_PAGE_SIZE", 2)
+    for term, field in [
+        ("Sales", "Revenue"),
+        ("sales", "Revenue"),  # same id once lower-cased
+        ("turnover", "Revenue"),
+        ("income", "Revenue"),
+        ("area", "Region"),
+        ("zone", "Region"),
+    ]:
+        store.add_learned_synonym("c1", term, field, "metric" if field == "Revenue" else "dimension")
+    store.add_learned_synonym("c2", "takings", "Revenue", "metric")
+
+    synonyms = store.get_learned_synonyms("c1")
+    assert {field: sorted(terms) for field, terms in synonyms.items()} == {
+        "Revenue": ["income", "sales", "turnover"],
+        "Region": ["area", "zone"],
+    }
+    assert list(store.get_learned_synonyms("c1", field_type="dimension")) == ["Region"]
+    assert sum(len(terms) for terms in store.get_learned_synonyms("c1", limit=3).values()) == 3